@@ -0,0 +1,104 @@
+"""Load test: concurrent agent sessions calling DB-backed tools on one event loop.
+
+Each simulated session runs a typical tool sequence (search, filter, detail,
+compare) against the real database. ``offloaded`` runs tool bodies on the tool
+thread pool; ``inline`` calls the same bodies directly on the event loop, as
+the tools did before they were offloaded. Reports wall time, per-call p50/p95
+latency and the worst event-loop stall (how long every other SSE stream on the
+worker would freeze).
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_agent_tools.py \\
+        [--sessions 8] [--rounds 3] [--modes offloaded inline]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from carms.agent import tools
+from carms.db.engine import engine
+
+
+def _sample_program_ids(n: int) -> list[int]:
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id FROM programs ORDER BY id LIMIT :n"), {"n": n})
+        return [row[0] for row in rows]
+
+
+def _workload(program_ids: list[int]) -> list[tuple]:
+    ids = ",".join(str(pid) for pid in program_ids[:3])
+    return [
+        (tools.search_programs, {"query": "rural family medicine", "top_k": 10}),
+        (tools.filter_programs, {"discipline": "Psychiatry"}),
+        (tools.get_program_detail, {"program_id": program_ids[0]}),
+        (tools.compare_programs, {"program_ids": ids}),
+        (tools.get_analytics, {}),
+    ]
+
+
+async def _call(mode: str, sdk_tool, args: dict) -> float:
+    start = time.perf_counter()
+    if mode == "offloaded":
+        await sdk_tool.handler(args)
+    else:
+        sdk_tool.handler.__wrapped__(args)  # blocking body on the event loop
+    return time.perf_counter() - start
+
+
+async def _session(mode: str, workload: list[tuple], rounds: int, latencies: list[float]):
+    for _ in range(rounds):
+        for sdk_tool, args in workload:
+            latencies.append(await _call(mode, sdk_tool, args))
+            await asyncio.sleep(0)  # the agent would yield to stream to the client here
+
+
+async def _heartbeat(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - start - 0.005)
+    return worst
+
+
+async def _run(mode: str, sessions: int, rounds: int, workload: list[tuple]) -> None:
+    latencies: list[float] = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(_session(mode, workload, rounds, latencies) for _ in range(sessions)))
+    wall = time.perf_counter() - start
+    stop.set()
+    stall = await heartbeat
+
+    p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0
+    print(
+        f"{mode:<10} {sessions:>8} {len(latencies):>6} {wall:>8.2f} "
+        f"{statistics.median(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f} {stall * 1000:>10.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--modes", nargs="+", default=["offloaded", "inline"], choices=["offloaded", "inline"]
+    )
+    args = parser.parse_args()
+
+    workload = _workload(_sample_program_ids(3))
+    print(
+        f"{'mode':<10} {'sessions':>8} {'calls':>6} {'wall s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'stall ms':>10}"
+    )
+    for mode in args.modes:
+        asyncio.run(_run(mode, args.sessions, args.rounds, workload))
+
+
+if __name__ == "__main__":
+    main()
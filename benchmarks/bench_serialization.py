@@ -0,0 +1,88 @@
+"""Micro-benchmark: Pydantic response_model path vs. FastJSONResponse path.
+
+Compares how list/search responses were serialized before (one Pydantic model
+per row, then FastAPI re-validation against ``response_model`` and
+``jsonable_encoder`` + stdlib ``json``) with the trusted-row path (plain dicts
+rendered by ``FastJSONResponse``). No database is needed.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 200] [--repeat 200]
+"""
+
+import argparse
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from carms.api.responses import FastJSONResponse
+from carms.api.schemas import ProgramSummary
+
+
+def _rows(n: int) -> list[tuple]:
+    return [
+        (
+            i,
+            f"University {i % 17} / Family Medicine / Site {i % 40} / CMG Stream",
+            "Family Medicine",
+            f"University {i % 17}",
+            f"Site {i % 40}",
+            "CMG Stream for CMG",
+            f"https://phx.e-carms.ca/phoenix-web/pd/ajax/program/1503/{27000 + i}",
+        )
+        for i in range(n)
+    ]
+
+
+def old_path(rows: list[tuple], adapter: TypeAdapter) -> bytes:
+    models = [
+        ProgramSummary(
+            id=r[0], name=r[1], discipline=r[2], school=r[3], site=r[4], stream=r[5], url=r[6]
+        )
+        for r in rows
+    ]
+    # What FastAPI does with a response_model: dump, re-validate, encode, json.dumps
+    dumped = [m.model_dump() for m in models]
+    validated = adapter.validate_python(dumped)
+    content = jsonable_encoder(adapter.dump_python(validated))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def new_path(rows: list[tuple]) -> bytes:
+    content = [
+        {
+            "id": r[0],
+            "name": r[1],
+            "discipline": r[2],
+            "school": r[3],
+            "site": r[4],
+            "stream": r[5],
+            "url": r[6],
+        }
+        for r in rows
+    ]
+    return FastJSONResponse(content).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = _rows(args.rows)
+    adapter = TypeAdapter(list[ProgramSummary])
+    assert json.loads(old_path(rows, adapter)) == json.loads(new_path(rows))
+
+    old = timeit.timeit(lambda: old_path(rows, adapter), number=args.repeat) / args.repeat
+    new = timeit.timeit(lambda: new_path(rows), number=args.repeat) / args.repeat
+
+    print(f"rows={args.rows} repeat={args.repeat}")
+    print(f"pydantic response_model: {old * 1000:8.3f} ms/response")
+    print(f"FastJSONResponse:        {new * 1000:8.3f} ms/response")
+    print(f"speedup:                 {old / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
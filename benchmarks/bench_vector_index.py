@@ -0,0 +1,126 @@
+"""Recall@k / latency benchmark for compact vector index modes.
+
+Builds (if missing) one HNSW index per mode on ``program_embeddings``, samples
+stored chunk embeddings as queries (no embedding API calls), and compares each
+mode against exact top-k by cosine distance. Reports recall@k, p50/p95 latency
+and index size.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_vector_index.py \\
+        [--modes full halfvec binary truncated] [--index-dim 512] [--k 10] \\
+        [--queries 100] [--rerank-factor 4] [--drop]
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from carms.config import settings
+from carms.search.vector_index import INDEX_MODES, index_ddl, index_name, shortlist_distance
+
+
+def _search_sql(mode: str, dim: int, index_dim: int | None) -> str:
+    shortlist = shortlist_distance(mode, dim, index_dim)
+    if shortlist is None:
+        return """
+            SELECT pe.id FROM program_embeddings pe
+            ORDER BY pe.embedding <=> CAST(:embedding AS vector)
+            LIMIT :k
+        """
+    return f"""
+        SELECT sl.id FROM (
+            SELECT pe.id, pe.embedding FROM program_embeddings pe
+            ORDER BY {shortlist}
+            LIMIT :shortlist_k
+        ) sl
+        ORDER BY sl.embedding <=> CAST(:embedding AS vector)
+        LIMIT :k
+    """
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=list(INDEX_MODES), choices=INDEX_MODES)
+    parser.add_argument("--index-dim", type=int, default=512, help="dims for 'truncated'")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--rerank-factor", type=int, default=settings.vector_rerank_factor)
+    parser.add_argument("--drop", action="store_true", help="drop compact indexes afterwards")
+    args = parser.parse_args()
+
+    dim = settings.embedding_dim
+    engine = create_engine(settings.database_url)
+    shortlist_k = args.k * args.rerank_factor
+
+    with engine.connect() as conn:
+        for mode in args.modes:
+            print(f"ensuring index {index_name(mode)} ...")
+            conn.execute(text(index_ddl(mode, dim, args.index_dim)))
+        conn.execute(text("ANALYZE program_embeddings"))
+        conn.commit()
+
+        queries = [
+            row[0]
+            for row in conn.execute(
+                text(
+                    "SELECT embedding::text FROM program_embeddings "
+                    "ORDER BY random() LIMIT :n"
+                ),
+                {"n": args.queries},
+            )
+        ]
+
+        # Ground truth: exact scan with index scans disabled
+        conn.execute(text("SET enable_indexscan = off"))
+        truth = [
+            {
+                row[0]
+                for row in conn.execute(
+                    text(_search_sql("full", dim, None)), {"embedding": q, "k": args.k}
+                )
+            }
+            for q in queries
+        ]
+        conn.execute(text("RESET enable_indexscan"))
+        conn.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef, false)"),
+            {"ef": str(max(40, shortlist_k))},
+        )
+
+        print(f"\nk={args.k} queries={len(queries)} shortlist={shortlist_k} dim={dim}")
+        print(f"{'mode':<10} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'index MB':>9}")
+        for mode in args.modes:
+            sql = text(_search_sql(mode, dim, args.index_dim))
+            recalls, latencies = [], []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                found = {
+                    row[0]
+                    for row in conn.execute(
+                        sql, {"embedding": q, "k": args.k, "shortlist_k": shortlist_k}
+                    )
+                }
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(found & expected) / max(len(expected), 1))
+
+            size = conn.execute(
+                text("SELECT pg_relation_size(CAST(:name AS regclass))"),
+                {"name": index_name(mode)},
+            ).scalar_one()
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0
+            print(
+                f"{mode:<10} {statistics.mean(recalls):>9.3f} "
+                f"{statistics.median(latencies):>8.2f} {p95:>8.2f} {size / 2**20:>9.1f}"
+            )
+
+        if args.drop:
+            for mode in args.modes:
+                if mode != "full":
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index_name(mode)}"))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 """Claude Agent SDK integration for conversational program exploration."""
 
+import asyncio
+
 from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
 
+from carms.agent.session_store import get_session_store
 from carms.agent.tools import carms_mcp_server
 from carms.config import settings
 
@@ -14,6 +17,7 @@ at Canadian medical schools.
 - Filter programs by discipline, school, site, or stream
 - Get detailed information about any specific program
 - Compare multiple programs side by side
+- Find programs similar to a given program
 - List all disciplines and schools with program counts
 - Provide aggregate analytics about the program landscape
 
@@ -27,20 +31,34 @@ at Canadian medical schools.
 - Explain *why* each recommended program is a good match based on the profile.
 
 **Guidelines:**
-- When a student describes what they're looking for, use semantic search first
+- When a student describes what they're looking for, use semantic search first; pass the
+  discipline, school, site or stream they mention as `search_programs` filters in the same call
+  rather than calling `filter_programs` separately
+- To look at several programs, call `get_program_details` once with all their IDs
 - Present results clearly with key details (school, discipline, site, stream)
 - Offer to show more details or compare programs when relevant
 - Be helpful and encouraging - choosing a residency program is a big decision
 - If you're unsure, ask clarifying questions about their preferences
 - Use the compare tool when students are deciding between specific programs
+- When a student asks for programs "like" one they mention, use `similar_programs`
 - Always provide program IDs so students can ask for more details
+
+**Tool results:**
+- List results are tables: `columns` names each position in every `rows` entry
+- `get_program_detail` and `compare_programs` return digests: a few key facts per section.
+  Answer from the digest when it covers the question; ask for specific `sections` (or
+  `full` comparisons) only when the student needs the full text
+- Long text ends with "…" when cut; a larger `max_chars` returns more of a section
+- Pass `fields` to request just the columns you need
 """
 
 AGENT_TOOLS = [
     "mcp__carms__search_programs",
     "mcp__carms__filter_programs",
     "mcp__carms__get_program_detail",
+    "mcp__carms__get_program_details",
     "mcp__carms__compare_programs",
+    "mcp__carms__similar_programs",
     "mcp__carms__list_disciplines",
     "mcp__carms__list_schools",
     "mcp__carms__get_analytics",
@@ -67,7 +85,7 @@ def is_agent_available() -> bool:
 
 
 # Maps our session IDs to Claude Code session IDs for resume
-_claude_sessions: dict[str, str] = {}
+_claude_sessions = get_session_store("claude_sessions")
 
 
 async def create_client(session_id: str | None = None) -> ClaudeSDKClient:
@@ -77,7 +95,9 @@ async def create_client(session_id: str | None = None) -> ClaudeSDKClient:
     reused across different async contexts (FastAPI requests). Multi-turn
     context is preserved via the ``resume`` option.
     """
-    claude_session_id = _claude_sessions.get(session_id) if session_id else None
+    claude_session_id = (
+        await asyncio.to_thread(_claude_sessions.get, session_id) if session_id else None
+    )
     options = _create_agent_options(resume_session_id=claude_session_id)
     client = ClaudeSDKClient(options=options)
     await client.connect()
@@ -86,9 +106,9 @@ async def create_client(session_id: str | None = None) -> ClaudeSDKClient:
 
 def store_claude_session(our_session_id: str, claude_session_id: str) -> None:
     """Store mapping from our session ID to Claude Code session ID."""
-    _claude_sessions[our_session_id] = claude_session_id
+    _claude_sessions.set(our_session_id, claude_session_id)
 
 
 def cleanup_session(session_id: str) -> None:
     """Remove session mapping."""
-    _claude_sessions.pop(session_id, None)
+    _claude_sessions.delete(session_id)
@@ -0,0 +1,225 @@
+"""Deterministic fast path for simple chat messages.
+
+Many messages are plain lookups: "how many programs are there", "list the
+schools", "show program 1234". ``route_message`` recognizes these with
+anchored patterns - the whole message must match, so "how many programs in
+Toronto offer research?" still goes to the agent - and answers them from the
+same queries the agent tools use, in milliseconds and without an LLM call.
+
+Whenever a message doesn't match, or a name in it can't be resolved to one
+discipline, school, site or stream, it returns ``None`` and the agent answers.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from carms.agent.queries import (
+    DETAIL_SECTIONS,
+    discipline_counts,
+    get_session,
+    program_details,
+    resolve_name,
+    school_counts,
+)
+from carms.timing import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Intent:
+    name: str  # "count", "list_schools", "list_disciplines" or "show_program"
+    params: dict[str, str] = field(default_factory=dict)
+
+
+_LEAD = re.compile(r"^(?:(?:please|hey|hi|ok|okay|so|can you|could you|would you)[\s,]+)+")
+_TRAIL = re.compile(r"(?:[\s,]+please)?[\s?.!]*$")
+
+_SCOPE = r"[\w .'&/-]+?"
+_LIST = r"(?:list|show|give|tell|what are|which are|name)(?: me)?(?: all| every)?(?: of)?(?: the)?"
+_THERE = r"(?: (?:are there|are listed|do you have|are in carms|participate))?"
+
+INTENT_PATTERNS = [
+    (
+        "count",
+        re.compile(
+            rf"how many (?:(?P<before>{_SCOPE}) )?"
+            r"(?P<what>programs|disciplines|specialties|schools)"
+            r"(?: are| is)?(?: there| listed| available| offered)?"
+            rf"(?: (?:in|at|for|from) (?P<after>{_SCOPE}))?"
+            r"(?: are there| in total| total| overall)?"
+        ),
+    ),
+    (
+        "list_schools",
+        re.compile(rf"(?:{_LIST}|what|which) (?:medical |participating )?schools{_THERE}"),
+    ),
+    (
+        "list_disciplines",
+        re.compile(rf"(?:{_LIST}|what|which) (?:disciplines|specialties|specialities){_THERE}"),
+    ),
+    (
+        "show_program",
+        re.compile(
+            r"(?:(?:show|get|display|open|describe|tell me about|details (?:for|of|on|about))"
+            r"(?: me)?(?: the)?(?: details (?:for|of|on|about))? )?"
+            r"program(?: id| number)? ?#?(?P<program_id>\d+)(?: details| info)?"
+        ),
+    ),
+]
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, collapse whitespace, drop pleasantries and trailing punctuation."""
+    normalized = " ".join(message.lower().split())
+    normalized = _LEAD.sub("", normalized)
+    return _TRAIL.sub("", normalized)
+
+
+def classify(message: str) -> Intent | None:
+    """The intent ``message`` expresses in full, or ``None``."""
+    normalized = normalize_message(message)
+    for name, pattern in INTENT_PATTERNS:
+        match = pattern.fullmatch(normalized)
+        if match:
+            params = {key: value for key, value in match.groupdict().items() if value}
+            return Intent(name, params)
+    return None
+
+
+def _scope_filter(session: Session, scope: str) -> tuple[str, dict, str] | None:
+    """Condition on ``programs p`` for a scope phrase, with a description of what it counts.
+
+    Tried in order: stream (CMG/IMG), discipline, site (exact), school.
+    """
+    scope = scope.removeprefix("the ").strip()
+    if scope in ("cmg", "img"):
+        return "p.stream ILIKE :scope", {"scope": f"%{scope}%"}, f"{scope.upper()} programs"
+
+    resolved, _ = resolve_name(session, "disciplines", scope)
+    if resolved is not None:
+        name = session.execute(
+            text("SELECT name FROM disciplines WHERE id = :id"), {"id": resolved}
+        ).scalar_one()
+        return "p.discipline_id = :scope", {"scope": resolved}, f"{name} programs"
+
+    site = session.execute(
+        text("SELECT site FROM programs WHERE LOWER(TRIM(site)) = :site LIMIT 1"),
+        {"site": scope},
+    ).scalar()
+    if site is not None:
+        return "LOWER(TRIM(p.site)) = :scope", {"scope": scope}, f"programs in {site}"
+
+    resolved, _ = resolve_name(session, "schools", scope)
+    if resolved is not None:
+        name = session.execute(
+            text("SELECT name FROM schools WHERE id = :id"), {"id": resolved}
+        ).scalar_one()
+        return "p.school_id = :scope", {"scope": resolved}, f"programs at {name}"
+    return None
+
+
+def _count(session: Session, params: dict[str, str]) -> str | None:
+    what = params["what"]
+    scope = params.get("before") or params.get("after")
+    if params.get("before") and params.get("after"):
+        return None
+
+    if what != "programs":
+        if scope:
+            return None
+        table_name = "schools" if what == "schools" else "disciplines"
+        count = session.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar_one()
+        return f"There are **{count}** {table_name}."
+
+    if scope is None:
+        where, sql_params, counted = "", {}, "residency programs"
+    else:
+        scope_filter = _scope_filter(session, scope)
+        if scope_filter is None:
+            return None
+        condition, sql_params, counted = scope_filter
+        where = f"WHERE {condition}"
+
+    count = session.execute(
+        text(f"SELECT COUNT(*) FROM programs p {where}"), sql_params
+    ).scalar_one()
+    if count == 1:
+        return f"There is **1** {counted.replace('programs', 'program', 1)}."
+    return f"There are **{count}** {counted}."
+
+
+def _list_schools(session: Session, params: dict[str, str]) -> str:
+    schools = school_counts(session)
+    lines = [f"**{len(schools)} schools** offer CaRMS residency programs:", ""]
+    lines += [f"- {s['name']} ({s['program_count']} programs)" for s in schools]
+    return "\n".join(lines)
+
+
+def _list_disciplines(session: Session, params: dict[str, str]) -> str:
+    disciplines = discipline_counts(session)
+    lines = [f"**{len(disciplines)} disciplines** have CaRMS residency programs:", ""]
+    lines += [f"- {d['name']} ({d['program_count']} programs)" for d in disciplines]
+    return "\n".join(lines)
+
+
+def _show_program(session: Session, params: dict[str, str]) -> str:
+    program_id = int(params["program_id"])
+    details = program_details(session, [program_id], max_chars=300)
+    if not details:
+        return f"Program {program_id} not found."
+
+    detail = details[0]
+    lines = [
+        f"**{detail['name']}** (ID {program_id})",
+        "",
+        f"- Discipline: {detail['discipline']}",
+        f"- School: {detail['school']}",
+        f"- Site: {detail['site']}",
+        f"- Stream: {detail['stream']}",
+    ]
+    if detail.get("url"):
+        lines.append(f"- Program page: {detail['url']}")
+
+    # The digest's key facts, or (before digests are built) the truncated sections
+    sections = detail.get("digest") or {
+        key: [detail[key]] for key in DETAIL_SECTIONS if key in detail
+    }
+    for key, facts in sections.items():
+        lines += ["", f"**{key.replace('_', ' ').capitalize()}**"]
+        lines += [f"- {fact}" for fact in facts]
+    lines += ["", "Ask about any section (e.g. interviews) for more detail."]
+    return "\n".join(lines)
+
+
+ANSWERS = {
+    "count": _count,
+    "list_schools": _list_schools,
+    "list_disciplines": _list_disciplines,
+    "show_program": _show_program,
+}
+
+
+def answer(session: Session, intent: Intent) -> str | None:
+    """Markdown answer for ``intent``, or ``None`` if it can't be answered confidently."""
+    return ANSWERS[intent.name](session, intent.params)
+
+
+def route_message(message: str) -> str | None:
+    """Answer ``message`` directly if it is a simple lookup; ``None`` sends it to the agent."""
+    intent = classify(message)
+    if intent is None:
+        return None
+    try:
+        with span("agent.fast_path"), get_session() as session:
+            reply = answer(session, intent)
+    except Exception as e:
+        logger.warning("Fast path %s failed, falling back to the agent: %s", intent.name, e)
+        return None
+    if reply is not None:
+        logger.info("Fast path answered %s %s", intent.name, intent.params)
+    return reply
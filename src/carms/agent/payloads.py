@@ -0,0 +1,72 @@
+"""Compact, token-efficient encoding of agent tool results.
+
+Tool output is the largest share of input tokens in an agent turn, so results
+are encoded as tables (``{"columns": [...], "rows": [[...], ...]}``) without
+indentation, long text fields are cut to per-field character budgets, empty
+fields are dropped, and tools accept a ``fields`` argument to return only the
+columns the model asks for.
+"""
+
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# Default character budgets for free-text fields; callers may override per call
+FIELD_BUDGETS = {
+    "relevant_text": 300,
+    "section": 600,
+    "compare_section": 400,
+}
+
+
+def truncate(value: str | None, limit: int) -> str | None:
+    """Cut ``value`` to at most ``limit`` characters on a word boundary, marked with "…"."""
+    if not value or len(value) <= limit:
+        return value
+    cut = value[: limit - 1]
+    if " " in cut[limit // 2 :]:
+        cut = cut[: cut.rindex(" ")]
+    return cut.rstrip() + "…"
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    """``"name,school"`` -> ``["name", "school"]``; ``None`` or blank means all fields."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()] or None
+
+
+def select_fields(
+    rows: list[dict[str, Any]], fields: list[str] | None, keep: tuple[str, ...] = ("program_id",)
+) -> list[dict[str, Any]]:
+    """Keep only ``fields`` (plus ``keep``) in each row, in the rows' own key order."""
+    if fields is None:
+        return rows
+    wanted = set(fields) | set(keep)
+    return [{key: value for key, value in row.items() if key in wanted} for row in rows]
+
+
+def table(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """Columnar encoding: column names once, then one value list per row."""
+    columns = list(rows[0]) if rows else []
+    return {"columns": columns, "rows": [[row.get(col) for col in columns] for row in rows]}
+
+
+def compact(data: Any) -> str:
+    """JSON without indentation or spaces after separators."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def tool_result(tool: str, data: Any, note: str | None = None) -> dict[str, Any]:
+    """Encode ``data`` as the tool's text content and log the payload size."""
+    text = compact(data)
+    if note:
+        text = f"{note}\n{text}"
+    logger.info(
+        "Tool %s payload: %d chars (~%d tokens)", tool, len(text), len(text) // CHARS_PER_TOKEN
+    )
+    return {"content": [{"type": "text", "text": text}]}
@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import logging
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 
 import anthropic
 
+from carms.agent.session_store import get_session_store
 from carms.config import settings
 
 logger = logging.getLogger(__name__)
@@ -104,20 +106,21 @@ class ApplicantProfile:
         )
 
 
-# In-memory storage keyed by session_id (same pattern as _claude_sessions in agent.py)
-_session_profiles: dict[str, ApplicantProfile] = {}
+# Profiles keyed by session_id, in the same session store backend as _claude_sessions
+_session_profiles = get_session_store("profiles")
 
 
 def store_profile(profile: ApplicantProfile) -> None:
-    _session_profiles[profile.session_id] = profile
+    _session_profiles.set(profile.session_id, asdict(profile))
 
 
 def get_profile(session_id: str) -> ApplicantProfile | None:
-    return _session_profiles.get(session_id)
+    data = _session_profiles.get(session_id)
+    return ApplicantProfile(**data) if data is not None else None
 
 
 def clear_profile(session_id: str) -> None:
-    _session_profiles.pop(session_id, None)
+    _session_profiles.delete(session_id)
 
 
 def is_valid_pdf(data: bytes) -> bool:
@@ -222,7 +225,7 @@ async def extract_profile_from_pdf(
         summary=_ensure_optional_str(data.get("summary")),
     )
 
-    store_profile(profile)
+    await asyncio.to_thread(store_profile, profile)
     return profile
 
 
@@ -0,0 +1,152 @@
+"""Read queries shared by the agent tools and the chat fast path.
+
+Each takes a ``Session`` (``get_session`` opens one with the agent's statement
+timeout) and returns plain dicts and lists, ready to encode as tool results or
+render as Markdown.
+"""
+
+from typing import Any
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from carms.agent.payloads import FIELD_BUDGETS, truncate
+from carms.config import settings
+from carms.db.engine import engine
+from carms.search.digests import load_digests
+
+
+def get_session() -> Session:
+    """Session on the shared engine, with this call's statement timeout."""
+    session = Session(engine)
+    timeout_ms = int(settings.agent_tool_timeout_seconds * 1000)
+    session.execute(
+        text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(timeout_ms)}
+    )
+    return session
+
+
+# Description sections of program_details, in SELECT order
+DETAIL_SECTIONS = (
+    "contacts",
+    "general_instructions",
+    "supporting_docs",
+    "review_process",
+    "interviews",
+    "selection_criteria",
+    "highlights",
+    "curriculum",
+    "training_sites",
+    "additional_info",
+    "return_of_service",
+)
+
+
+def _like_pattern(value: str) -> str:
+    """``ILIKE`` pattern matching ``value`` anywhere, its wildcards escaped (``ESCAPE '\\'``)."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def resolve_name(session: Session, table_name: str, name: str) -> tuple[int | None, list[str]]:
+    """Id of the discipline or school called ``name``, else the names it could mean.
+
+    An exact (case-insensitive) name wins; otherwise a partial match must be unique.
+    """
+    name = name.strip()
+    rows = session.execute(
+        text(
+            f"SELECT id, name FROM {table_name} WHERE name ILIKE :pattern ESCAPE '\\' ORDER BY name"
+        ),
+        {"pattern": _like_pattern(name)},
+    ).fetchall()
+    for row_id, full_name in rows:
+        if full_name.lower() == name.lower():
+            return row_id, []
+    if len(rows) == 1:
+        return rows[0][0], []
+    return None, [row[1] for row in rows]
+
+
+def program_details(
+    session: Session,
+    program_ids: list[int],
+    sections: list[str] | None = None,
+    full: bool = False,
+    max_chars: int | None = None,
+) -> list[dict[str, Any]]:
+    """Program metadata plus its digest, or with ``full`` its section text.
+
+    ``sections`` limits the full text to those sections; programs without a
+    digest also get section text.
+    """
+    rows = session.execute(
+        text("""
+            SELECT p.id, p.name, d.name, s.name, p.site, p.stream, p.url,
+                   pd.program_contacts, pd.general_instructions,
+                   pd.supporting_documentation_information, pd.review_process,
+                   pd.interviews, pd.selection_criteria, pd.program_highlights,
+                   pd.program_curriculum, pd.training_sites,
+                   pd.additional_information, pd.return_of_service
+            FROM programs p
+            JOIN disciplines d ON p.discipline_id = d.id
+            JOIN schools s ON p.school_id = s.id
+            LEFT JOIN program_descriptions pd ON pd.program_id = p.id
+            WHERE p.id = ANY(:ids)
+            ORDER BY p.name
+        """),
+        {"ids": program_ids},
+    ).fetchall()
+    digests = {} if full else load_digests(session, program_ids)
+    max_chars = max_chars or FIELD_BUDGETS["section"]
+
+    details = []
+    for row in rows:
+        detail = {
+            "program_id": row[0],
+            "name": row[1],
+            "discipline": row[2],
+            "school": row[3],
+            "site": row[4],
+            "stream": row[5],
+            "url": row[6],
+        }
+        available = {name: value for name, value in zip(DETAIL_SECTIONS, row[7:]) if value}
+        digest = digests.get(row[0])
+        if digest is not None:
+            detail["digest"] = digest
+            detail["available_sections"] = list(available)
+        else:
+            for name, value in available.items():
+                if sections is None or name in sections:
+                    detail[name] = truncate(value, max_chars)
+        details.append(detail)
+    return details
+
+
+def discipline_counts(session: Session) -> list[dict[str, Any]]:
+    """Every discipline with its program count, by name."""
+    rows = session.execute(
+        text("""
+            SELECT d.id, d.name, COUNT(p.id) AS cnt
+            FROM disciplines d
+            LEFT JOIN programs p ON d.id = p.discipline_id
+            GROUP BY d.id, d.name
+            ORDER BY d.name
+        """)
+    ).fetchall()
+    return [{"id": row[0], "name": row[1], "program_count": row[2]} for row in rows]
+
+
+def school_counts(session: Session) -> list[dict[str, Any]]:
+    """Every school with its program count, most programs first."""
+    rows = session.execute(
+        text("""
+            SELECT s.id, s.name, COUNT(p.id) AS cnt
+            FROM schools s
+            LEFT JOIN programs p ON s.id = p.school_id
+            GROUP BY s.id, s.name
+            ORDER BY cnt DESC
+        """)
+    ).fetchall()
+    return [{"id": row[0], "name": row[1], "program_count": row[2]} for row in rows]
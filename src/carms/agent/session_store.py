@@ -0,0 +1,267 @@
+"""Bounded, optionally shared storage for per-session agent state.
+
+Chat sessions keep two things between requests: the Claude session id to
+resume and the applicant profile extracted from an uploaded PDF. Both live in
+named stores with JSON-serializable values, selected with
+``SESSION_STORE_BACKEND``:
+
+- ``memory`` (default): per-process LRU bounded by ``SESSION_STORE_MAX_ENTRIES``
+  and ``SESSION_STORE_MAX_BYTES`` (serialized size). Fine for one worker.
+- ``database``: the ``agent_sessions`` table, shared by every worker and
+  surviving restarts. Uses ``SESSION_STORE_URL`` if set (e.g.
+  ``sqlite:///sessions.db`` for a single node), else the main database.
+
+Entries in either backend expire ``SESSION_TTL_SECONDS`` after their last write.
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Protocol
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel
+
+from carms.config import settings
+from carms.db.models import AgentSessionEntry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoreStats:
+    """Counters exposed as metrics."""
+
+    entries: int = 0
+    bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class SessionStore(Protocol):
+    """Key-value store for one kind of session state; values must be JSON-serializable."""
+
+    name: str
+
+    def get(self, key: str) -> Any | None: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+class _StatsMixin:
+    """Name, TTL, clock and lock-guarded ``StoreStats`` shared by the backends."""
+
+    def _init_store(self, name: str, ttl_seconds: float, clock: Callable[[], float]) -> None:
+        self.name = name
+        self.ttl = ttl_seconds
+        self._clock = clock
+        self._stats = StoreStats()
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return asdict(self._stats)
+
+
+class MemorySessionStore(_StatsMixin):
+    """In-process LRU with a TTL, bounded by entry count and serialized bytes."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float,
+        max_entries: int,
+        max_bytes: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._init_store(name, ttl_seconds, clock)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expires_at, value, size in bytes)
+        self._entries: OrderedDict[str, tuple[float, Any, int]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._remove(key)
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        size = len(key) + len(json.dumps(value))
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl, value, size)
+            self._stats.entries += 1
+            self._stats.bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._stats.bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._stats.entries -= 1
+            self._stats.bytes -= entry[2]
+
+
+# Dialects with INSERT ... ON CONFLICT, which makes concurrent first writes safe
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class DatabaseSessionStore(_StatsMixin):
+    """Rows of ``agent_sessions`` (Postgres or SQLite), shared by every worker.
+
+    Writes are upserts. Expired rows are ignored on read and purged on write.
+    """
+
+    def __init__(
+        self, name: str, ttl_seconds: float, engine: Engine, clock: Callable[[], float] = time.time
+    ):
+        if engine.dialect.name not in _UPSERT_INSERTS:
+            raise ValueError(
+                f"Session store database must be PostgreSQL or SQLite, not {engine.dialect.name}"
+            )
+        self._init_store(name, ttl_seconds, clock)
+        self.engine = engine
+        self._insert = _UPSERT_INSERTS[engine.dialect.name]
+        self._table_ready = False
+
+    def _ensure_table(self) -> None:
+        if not self._table_ready:
+            SQLModel.metadata.create_all(self.engine, tables=[AgentSessionEntry.__table__])
+            self._table_ready = True
+
+    def get(self, key: str) -> Any | None:
+        self._ensure_table()
+        with Session(self.engine) as session:
+            entry = session.get(AgentSessionEntry, (self.name, key))
+        with self._lock:
+            if entry is None or entry.expires_at <= self._clock():
+                self._stats.misses += 1
+                return None
+            self._stats.hits += 1
+        return json.loads(entry.value)
+
+    def set(self, key: str, value: Any) -> None:
+        self._ensure_table()
+        now = self._clock()
+        upsert = self._insert(AgentSessionEntry.__table__).values(
+            store=self.name, key=key, value=json.dumps(value), expires_at=now + self.ttl
+        )
+        upsert = upsert.on_conflict_do_update(
+            index_elements=["store", "key"],
+            set_={"value": upsert.excluded.value, "expires_at": upsert.excluded.expires_at},
+        )
+        with Session(self.engine) as session:
+            session.execute(upsert)
+            purged = session.execute(
+                text("DELETE FROM agent_sessions WHERE store = :store AND expires_at <= :now"),
+                {"store": self.name, "now": now},
+            ).rowcount
+            session.commit()
+        if purged:
+            with self._lock:
+                self._stats.expirations += purged
+
+    def delete(self, key: str) -> None:
+        self._ensure_table()
+        with Session(self.engine) as session:
+            session.execute(
+                text("DELETE FROM agent_sessions WHERE store = :store AND key = :key"),
+                {"store": self.name, "key": key},
+            )
+            session.commit()
+
+    def stats(self) -> dict[str, int]:
+        stats = super().stats()
+        try:
+            self._ensure_table()
+            with Session(self.engine) as session:
+                row = session.execute(
+                    text("""
+                        SELECT COUNT(*), COALESCE(SUM(LENGTH(key) + LENGTH(value)), 0)
+                        FROM agent_sessions
+                        WHERE store = :store AND expires_at > :now
+                    """),
+                    {"store": self.name, "now": self._clock()},
+                ).one()
+            stats["entries"], stats["bytes"] = int(row[0]), int(row[1])
+        except Exception as e:
+            logger.warning("Session store %s stats failed: %s", self.name, e)
+        return stats
+
+
+_stores: dict[str, SessionStore] = {}
+_stores_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _database_engine() -> Engine:
+    if not settings.session_store_url:
+        from carms.db.engine import engine
+
+        return engine
+    connect_args = {}
+    if settings.session_store_url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False
+    return create_engine(settings.session_store_url, connect_args=connect_args)
+
+
+def create_session_store(name: str, backend: str | None = None) -> SessionStore:
+    """Build a store for the given backend name (default ``SESSION_STORE_BACKEND``)."""
+    backend = backend or settings.session_store_backend
+    if backend == "memory":
+        return MemorySessionStore(
+            name,
+            ttl_seconds=settings.session_ttl_seconds,
+            max_entries=settings.session_store_max_entries,
+            max_bytes=settings.session_store_max_bytes,
+        )
+    if backend == "database":
+        return DatabaseSessionStore(name, settings.session_ttl_seconds, _database_engine())
+    raise ValueError(
+        f"Unknown session store backend: {backend!r} (expected 'memory' or 'database')"
+    )
+
+
+def get_session_store(name: str) -> SessionStore:
+    """The process-wide store called ``name``, created on first use."""
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = create_session_store(name)
+        return store
+
+
+def session_store_stats() -> dict[str, dict[str, int]]:
+    with _stores_lock:
+        stores = dict(_stores)
+    return {name: store.stats() for name, store in stores.items()}
@@ -1,72 +1,214 @@
-"""Agent tools for CaRMS program exploration."""
-
-import json
+"""Agent tools for CaRMS program exploration.
+
+Tool bodies are blocking (SQLAlchemy, embedding calls), so ``offloaded`` runs
+them on a bounded thread pool against the shared, pooled engine, keeping the
+event loop free for other agent sessions' SSE streams. Each call is limited to
+``AGENT_TOOL_TIMEOUT_SECONDS``, enforced both on the awaiting side and as a
+Postgres ``statement_timeout``.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 from claude_agent_sdk import create_sdk_mcp_server, tool
-from sqlalchemy import create_engine, text
-from sqlmodel import Session
-
+from sqlalchemy import text
+
+from carms.agent.payloads import (
+    FIELD_BUDGETS,
+    parse_fields,
+    select_fields,
+    table,
+    tool_result,
+    truncate,
+)
+from carms.agent.queries import (
+    discipline_counts,
+    get_session,
+    program_details,
+    resolve_name,
+    school_counts,
+)
 from carms.config import settings
-from carms.search.embeddings import embed_query
+from carms.search.digests import load_digests
+from carms.search.retriever import SearchService
+from carms.search.similar import find_similar_programs
+from carms.timing import span
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _tool_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=settings.agent_tool_workers, thread_name_prefix="agent-tool"
+    )
+
+
+_JSON_TYPES = {str: "string", int: "integer", bool: "boolean", float: "number"}
+
+
+def _schema(properties: dict[str, type], required: tuple[str, ...] = ()) -> dict[str, Any]:
+    """JSON schema for a tool whose arguments outside ``required`` are optional."""
+    return {
+        "type": "object",
+        "properties": {name: {"type": _JSON_TYPES[kind]} for name, kind in properties.items()},
+        "required": list(required),
+    }
+
+
+def offloaded(name: str) -> Callable:
+    """Turn a blocking tool body into an async handler run on the tool pool.
+
+    Timing spans inside the body still reach the current request, and a call
+    that exceeds the timeout returns an error result instead of hanging the turn.
+    """
+
+    def decorator(fn: Callable[[dict[str, Any]], dict[str, Any]]) -> Callable:
+        @functools.wraps(fn)
+        async def handler(args: dict[str, Any]) -> dict[str, Any]:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(contextvars.copy_context().run, fn, args)
+            timeout = settings.agent_tool_timeout_seconds
+            with span(f"tool.{name}"):
+                try:
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(_tool_pool(), call), timeout=timeout
+                    )
+                except TimeoutError:
+                    logger.warning("Agent tool %s timed out after %.1fs", name, timeout)
+                    return {
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": f"{name} timed out after {timeout:.0f}s."
+                                " Try a narrower request.",
+                            }
+                        ],
+                        "is_error": True,
+                    }
+
+        return handler
+
+    return decorator
+
+
+# Most programs get_program_details returns in one call
+MAX_DETAIL_PROGRAMS = 20
+
+
+def _text(message: str) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": message}]}
+
+
+def _parse_ids(ids_str: str) -> list[int] | None:
+    """``"12, 34"`` -> ``[12, 34]``; ``None`` if any id isn't an integer."""
+    try:
+        return [int(x.strip()) for x in str(ids_str).split(",") if x.strip()]
+    except ValueError:
+        return None
 
 
-def _get_session() -> Session:
-    engine = create_engine(settings.database_url, echo=False, pool_pre_ping=True)
-    return Session(engine)
+def _requested_sections(args: dict[str, Any]) -> tuple[list[str] | None, bool]:
+    """``(sections, full)`` from a tool's ``sections`` argument; ``"all"`` means every one."""
+    sections = parse_fields(args.get("sections"))
+    if sections is None:
+        return None, False
+    return (None if sections == ["all"] else sections), True
+
+
+# Description of the digest/full-text behaviour shared by the detail tools
+DETAIL_HELP = (
+    " By default each program has `digest`: a few key facts per description section"
+    " (selection criteria, interviews, return of service, training sites, ...) and the names"
+    " of its `available_sections`. Pass `sections` (comma-separated, e.g."
+    " 'interviews,selection_criteria', or 'all') only when the full text is needed; each"
+    " section is cut to `max_chars` (default 600)."
+)
 
 
 @tool(
     "search_programs",
-    "Semantic search over CaRMS residency program descriptions."
-    " Use this when a user describes what they're looking for.",
-    {"query": str, "top_k": int},
+    "Semantic search over CaRMS residency program descriptions, one row per program."
+    " Use this when a user describes what they're looking for; narrow it in the same call"
+    " with `discipline`, `school` (names), `site` or `stream` ('CMG' or 'IMG')."
+    " Returns a table; `fields` (comma-separated, e.g. 'name,school') limits the columns.",
+    _schema(
+        {
+            "query": str,
+            "top_k": int,
+            "discipline": str,
+            "school": str,
+            "site": str,
+            "stream": str,
+            "fields": str,
+        },
+        required=("query",),
+    ),
 )
-async def search_programs(args: dict[str, Any]) -> dict[str, Any]:
+@offloaded("search_programs")
+def search_programs(args: dict[str, Any]) -> dict[str, Any]:
     query = args["query"]
     top_k = args.get("top_k", 10)
-    vector = embed_query(query)
-
-    with _get_session() as session:
-        rows = session.execute(
-            text("""
-                SELECT
-                    p.id, p.name, d.name AS discipline, s.name AS school,
-                    p.site, p.stream, pe.chunk_text,
-                    1 - (pe.embedding <=> CAST(:embedding AS vector)) AS similarity
-                FROM program_embeddings pe
-                JOIN programs p ON pe.program_id = p.id
-                JOIN disciplines d ON p.discipline_id = d.id
-                JOIN schools s ON p.school_id = s.id
-                ORDER BY pe.embedding <=> CAST(:embedding AS vector)
-                LIMIT :top_k
-            """),
-            {"embedding": str(vector), "top_k": top_k},
-        ).fetchall()
+    with get_session() as session:
+        filters = {}
+        for key, table_name in (("discipline", "disciplines"), ("school", "schools")):
+            if not args.get(key):
+                continue
+            resolved, candidates = resolve_name(session, table_name, args[key])
+            if resolved is None:
+                if not candidates:
+                    return _text(f"No {key} matches '{args[key]}'.")
+                return _text(
+                    f"'{args[key]}' matches several {table_name}: {'; '.join(candidates)}."
+                    f" Retry with one of these {key} names."
+                )
+            filters[f"{key}_id"] = resolved
+
+        service = SearchService(session)
+        rows = service.search(
+            query=query,
+            top_k=top_k,
+            site=args.get("site") or None,
+            stream=args.get("stream") or None,
+            group_by="program",
+            **filters,
+        )
+        degraded = service.last_plan.degraded if service.last_plan else None
 
     results = [
         {
-            "program_id": row[0],
-            "name": row[1],
-            "discipline": row[2],
-            "school": row[3],
-            "site": row[4],
-            "stream": row[5],
-            "relevant_text": row[6][:300],
-            "similarity": round(float(row[7]), 4),
+            "program_id": r.program_id,
+            "name": r.program_name,
+            "discipline": r.discipline,
+            "school": r.school,
+            "site": r.site,
+            "stream": r.stream,
+            "relevant_text": truncate(r.chunk_text, FIELD_BUDGETS["relevant_text"]),
+            "similarity": round(r.similarity, 3),
         }
-        for row in rows
+        for r in rows
     ]
+    payload = table(select_fields(results, parse_fields(args.get("fields"))))
+    if degraded:
+        # Keyword matches only; similarity is a text-rank score, not cosine
+        payload["degraded"] = degraded
 
-    return {"content": [{"type": "text", "text": json.dumps(results, indent=2)}]}
+    return tool_result("search_programs", payload)
 
 
 @tool(
     "filter_programs",
-    "Filter programs by discipline, school, site, or stream. Use this for structured queries.",
-    {"discipline": str, "school": str, "site": str, "stream": str},
+    "Filter programs by discipline, school, site, or stream. Use this for structured queries."
+    " Returns a table; `fields` (comma-separated) limits the columns.",
+    _schema({"discipline": str, "school": str, "site": str, "stream": str, "fields": str}),
 )
-async def filter_programs(args: dict[str, Any]) -> dict[str, Any]:
+@offloaded("filter_programs")
+def filter_programs(args: dict[str, Any]) -> dict[str, Any]:
     conditions = []
     params: dict[str, Any] = {}
 
@@ -85,7 +227,7 @@ async def filter_programs(args: dict[str, Any]) -> dict[str, Any]:
 
     where = "WHERE " + " AND ".join(conditions) if conditions else ""
 
-    with _get_session() as session:
+    with get_session() as session:
         rows = session.execute(
             text(f"""
                 SELECT p.id, p.name, d.name, s.name, p.site, p.stream
@@ -111,85 +253,74 @@ async def filter_programs(args: dict[str, Any]) -> dict[str, Any]:
         for row in rows
     ]
 
-    return {
-        "content": [
-            {
-                "type": "text",
-                "text": f"Found {len(results)} programs:\n{json.dumps(results, indent=2)}",
-            }
-        ]
-    }
+    payload = table(select_fields(results, parse_fields(args.get("fields"))))
+    return tool_result("filter_programs", payload, note=f"Found {len(results)} programs:")
 
 
 @tool(
     "get_program_detail",
-    "Get full details for a specific program including all description sections.",
-    {"program_id": int},
+    "Get details for a specific program." + DETAIL_HELP,
+    _schema({"program_id": int, "sections": str, "max_chars": int}, required=("program_id",)),
 )
-async def get_program_detail(args: dict[str, Any]) -> dict[str, Any]:
+@offloaded("get_program_detail")
+def get_program_detail(args: dict[str, Any]) -> dict[str, Any]:
     program_id = args["program_id"]
+    sections, full = _requested_sections(args)
 
-    with _get_session() as session:
-        row = session.execute(
-            text("""
-                SELECT p.name, d.name, s.name, p.site, p.stream, p.url,
-                       pd.program_contacts, pd.general_instructions,
-                       pd.supporting_documentation_information, pd.review_process,
-                       pd.interviews, pd.selection_criteria, pd.program_highlights,
-                       pd.program_curriculum, pd.training_sites,
-                       pd.additional_information, pd.return_of_service
-                FROM programs p
-                JOIN disciplines d ON p.discipline_id = d.id
-                JOIN schools s ON p.school_id = s.id
-                LEFT JOIN program_descriptions pd ON pd.program_id = p.id
-                WHERE p.id = :pid
-            """),
-            {"pid": program_id},
-        ).first()
-
-    if not row:
-        return {"content": [{"type": "text", "text": f"Program {program_id} not found."}]}
-
-    detail = {
-        "name": row[0],
-        "discipline": row[1],
-        "school": row[2],
-        "site": row[3],
-        "stream": row[4],
-        "url": row[5],
-        "contacts": row[6],
-        "general_instructions": row[7],
-        "supporting_docs": row[8],
-        "review_process": row[9],
-        "interviews": row[10],
-        "selection_criteria": row[11],
-        "highlights": row[12],
-        "curriculum": row[13],
-        "training_sites": row[14],
-        "additional_info": row[15],
-        "return_of_service": row[16],
-    }
+    with get_session() as session:
+        details = program_details(
+            session, [program_id], sections, full, max_chars=args.get("max_chars")
+        )
+
+    if not details:
+        return _text(f"Program {program_id} not found.")
+    return tool_result("get_program_detail", details[0])
+
+
+@tool(
+    "get_program_details",
+    f"Get details for up to {MAX_DETAIL_PROGRAMS} programs in one call; provide comma-separated"
+    " program IDs. Prefer this to calling get_program_detail once per program." + DETAIL_HELP,
+    _schema({"program_ids": str, "sections": str, "max_chars": int}, required=("program_ids",)),
+)
+@offloaded("get_program_details")
+def get_program_details(args: dict[str, Any]) -> dict[str, Any]:
+    program_ids = _parse_ids(args["program_ids"])
+    if not program_ids:
+        return _text("Invalid program IDs. Provide comma-separated integers.")
+    program_ids = list(dict.fromkeys(program_ids))[:MAX_DETAIL_PROGRAMS]
+    sections, full = _requested_sections(args)
+
+    with get_session() as session:
+        details = program_details(
+            session, program_ids, sections, full, max_chars=args.get("max_chars")
+        )
+
+    found = {detail["program_id"] for detail in details}
+    payload: dict[str, Any] = {"programs": details}
+    if missing := [pid for pid in program_ids if pid not in found]:
+        payload["not_found"] = missing
+    return tool_result("get_program_details", payload)
 
-    return {"content": [{"type": "text", "text": json.dumps(detail, indent=2, default=str)}]}
+
+# Sections compared side by side by compare_programs
+COMPARE_SECTIONS = ("selection_criteria", "highlights", "interviews")
 
 
 @tool(
     "compare_programs",
-    "Compare multiple programs side by side. Provide a list of program IDs.",
-    {"program_ids": str},
+    "Compare multiple programs side by side. Provide a list of program IDs."
+    " Sections are digests of key facts; set `full` to true for the section text instead."
+    " Returns a table; `fields` (comma-separated) limits the columns.",
+    _schema({"program_ids": str, "fields": str, "full": bool}, required=("program_ids",)),
 )
-async def compare_programs(args: dict[str, Any]) -> dict[str, Any]:
-    ids_str = args["program_ids"]
-    try:
-        program_ids = [int(x.strip()) for x in ids_str.split(",")]
-    except ValueError:
-        return {
-            "content": [
-                {"type": "text", "text": "Invalid program IDs. Provide comma-separated integers."}
-            ]
-        }
+@offloaded("compare_programs")
+def compare_programs(args: dict[str, Any]) -> dict[str, Any]:
+    program_ids = _parse_ids(args["program_ids"])
+    if not program_ids:
+        return _text("Invalid program IDs. Provide comma-separated integers.")
 
-    with _get_session() as session:
+    with get_session() as session:
         rows = session.execute(
             text("""
                 SELECT p.id, p.name, d.name, s.name, p.site, p.stream,
@@ -203,24 +334,60 @@ async def compare_programs(args: dict[str, Any]) -> dict[str, Any]:
             """),
             {"ids": program_ids},
         ).fetchall()
+        digests = {} if args.get("full") else load_digests(session, program_ids)
 
+    budget = FIELD_BUDGETS["compare_section"]
     programs = []
     for row in rows:
-        programs.append(
-            {
-                "program_id": row[0],
-                "name": row[1],
-                "discipline": row[2],
-                "school": row[3],
-                "site": row[4],
-                "stream": row[5],
-                "selection_criteria": (row[6] or "")[:500],
-                "highlights": (row[7] or "")[:500],
-                "interviews": (row[8] or "")[:500],
-            }
+        program = {
+            "program_id": row[0],
+            "name": row[1],
+            "discipline": row[2],
+            "school": row[3],
+            "site": row[4],
+            "stream": row[5],
+        }
+        digest = digests.get(row[0])
+        for name, value in zip(COMPARE_SECTIONS, row[6:]):
+            program[name] = digest.get(name) if digest is not None else truncate(value, budget)
+        programs.append(program)
+
+    payload = table(select_fields(programs, parse_fields(args.get("fields"))))
+    return tool_result("compare_programs", payload)
+
+
+@tool(
+    "similar_programs",
+    "Find programs most similar to a given program ID (no text query needed)."
+    " Set same_discipline to true to stay within the program's discipline.",
+    _schema({"program_id": int, "top_k": int, "same_discipline": bool}, required=("program_id",)),
+)
+@offloaded("similar_programs")
+def similar_programs(args: dict[str, Any]) -> dict[str, Any]:
+    program_id = args["program_id"]
+    top_k = args.get("top_k", 10)
+
+    with get_session() as session:
+        results = find_similar_programs(
+            session, program_id, k=top_k, same_discipline=bool(args.get("same_discipline"))
         )
 
-    return {"content": [{"type": "text", "text": json.dumps(programs, indent=2, default=str)}]}
+    if not results:
+        return _text(f"No similar programs found for program {program_id}.")
+
+    programs = [
+        {
+            "program_id": r.program_id,
+            "name": r.program_name,
+            "discipline": r.discipline,
+            "school": r.school,
+            "site": r.site,
+            "stream": r.stream,
+            "similarity": round(r.similarity, 3),
+        }
+        for r in results
+    ]
+    return tool_result("similar_programs", table(programs))
 
 
 @tool(
@@ -228,20 +395,11 @@ async def compare_programs(args: dict[str, Any]) -> dict[str, Any]:
     "List all 37 medical disciplines with program counts.",
     {},
 )
-async def list_disciplines(args: dict[str, Any]) -> dict[str, Any]:
-    with _get_session() as session:
-        rows = session.execute(
-            text("""
-                SELECT d.id, d.name, COUNT(p.id) AS cnt
-                FROM disciplines d
-                LEFT JOIN programs p ON d.id = p.discipline_id
-                GROUP BY d.id, d.name
-                ORDER BY d.name
-            """)
-        ).fetchall()
-
-    results = [{"id": row[0], "name": row[1], "program_count": row[2]} for row in rows]
-    return {"content": [{"type": "text", "text": json.dumps(results, indent=2)}]}
+@offloaded("list_disciplines")
+def list_disciplines(args: dict[str, Any]) -> dict[str, Any]:
+    with get_session() as session:
+        results = discipline_counts(session)
+    return tool_result("list_disciplines", table(results))
 
 
 @tool(
@@ -249,20 +407,11 @@ async def list_disciplines(args: dict[str, Any]) -> dict[str, Any]:
     "List all Canadian medical schools with program counts.",
     {},
 )
-async def list_schools(args: dict[str, Any]) -> dict[str, Any]:
-    with _get_session() as session:
-        rows = session.execute(
-            text("""
-                SELECT s.id, s.name, COUNT(p.id) AS cnt
-                FROM schools s
-                LEFT JOIN programs p ON s.id = p.school_id
-                GROUP BY s.id, s.name
-                ORDER BY cnt DESC
-            """)
-        ).fetchall()
-
-    results = [{"id": row[0], "name": row[1], "program_count": row[2]} for row in rows]
-    return {"content": [{"type": "text", "text": json.dumps(results, indent=2)}]}
+@offloaded("list_schools")
+def list_schools(args: dict[str, Any]) -> dict[str, Any]:
+    with get_session() as session:
+        results = school_counts(session)
+    return tool_result("list_schools", table(results))
 
 
 @tool(
@@ -270,8 +419,9 @@ async def list_schools(args: dict[str, Any]) -> dict[str, Any]:
     "Get aggregate statistics about CaRMS programs.",
     {},
 )
-async def get_analytics(args: dict[str, Any]) -> dict[str, Any]:
-    with _get_session() as session:
+@offloaded("get_analytics")
+def get_analytics(args: dict[str, Any]) -> dict[str, Any]:
+    with get_session() as session:
         stats = {}
         stats["total_programs"] = session.execute(text("SELECT COUNT(*) FROM programs")).scalar()
         stats["total_disciplines"] = session.execute(
@@ -296,7 +446,7 @@ async def get_analytics(args: dict[str, Any]) -> dict[str, Any]:
         ).fetchall()
         stats["top_sites"] = [{"site": r[0], "count": r[1]} for r in top_sites]
 
-    return {"content": [{"type": "text", "text": json.dumps(stats, indent=2)}]}
+    return tool_result("get_analytics", stats)
 
 
 # Create MCP server with all tools
@@ -307,7 +457,9 @@ carms_mcp_server = create_sdk_mcp_server(
         search_programs,
         filter_programs,
         get_program_detail,
+        get_program_details,
         compare_programs,
+        similar_programs,
         list_disciplines,
         list_schools,
         get_analytics,
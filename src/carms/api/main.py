@@ -8,7 +8,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from carms.api.routers import analytics, disciplines, health, programs, reports, search
+from carms.api.metrics import TimingMiddleware
+from carms.api.responses import FastJSONResponse
+from carms.api.routers import (
+    analytics,
+    disciplines,
+    health,
+    metrics,
+    programs,
+    reports,
+    search,
+)
 
 STATIC_DIR = Path(__file__).parent / "static"
 
@@ -17,13 +27,20 @@ STATIC_DIR = Path(__file__).parent / "static"
 async def lifespan(app: FastAPI):
     """Pre-load embedding model on startup."""
     try:
-        from carms.search.embeddings import get_embedding_model
+        from carms.config import settings
+        from carms.search.embeddings import get_embedding_provider
 
-        get_embedding_model()
+        provider = get_embedding_provider()
+        if settings.embedding_backend == "local":
+            provider.embed_query("warm up")  # load weights before the first request
     except Exception:
         pass  # Model loading is optional at startup
     yield
 
+    from carms.search.embeddings import shutdown_embedding_batcher
+
+    shutdown_embedding_batcher()
+
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
@@ -32,6 +49,7 @@ def create_app() -> FastAPI:
         description="AI-powered Canadian medical residency program discovery platform",
         version="0.1.0",
         lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
 
     # CORS
@@ -41,10 +59,14 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing"],
     )
+    # Per-stage Server-Timing headers and latency histograms for /metrics
+    app.add_middleware(TimingMiddleware)
 
     # Core routers
     app.include_router(health.router)
+    app.include_router(metrics.router)
     app.include_router(disciplines.router)
     app.include_router(programs.router)
     app.include_router(search.router)
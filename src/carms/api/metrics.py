@@ -0,0 +1,127 @@
+"""Request timing middleware and Prometheus text exposition."""
+
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from carms.timing import registry, server_timing_header, start_request
+
+REQUEST_METRIC = "carms_request_duration_seconds"
+
+
+class TimingMiddleware:
+    """Collects ``carms.timing`` spans per request.
+
+    Adds a ``Server-Timing`` header with every stage that finished before the
+    response started (plus ``total``), and records the request duration per
+    route template, method and status. Streaming responses report stages up
+    to their first chunk; their histogram entry covers the whole stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = start_request()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing_header({**timings, "total": total}))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get("route")
+            registry.observe(
+                REQUEST_METRIC,
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=str(status),
+            )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _pool_gauges() -> dict[str, float]:
+    from carms.db.engine import engine
+
+    pool = engine.pool
+    gauges = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            gauges[f"carms_db_pool_{name}"] = method()
+    return gauges
+
+
+def render_prometheus() -> str:
+    """All histograms, DB pool gauges and coalescing/batching/session-store metrics as text."""
+    lines: list[str] = []
+    histograms = registry.snapshot()
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f"{name}_bucket{_format_labels(labels, le=str(bound))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    for name, value in _pool_gauges().items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+
+    from carms.search.embeddings import embedding_batcher_stats
+    from carms.singleflight import singleflight_stats
+
+    flights = singleflight_stats()
+    for counter in ("calls", "executions", "coalesced"):
+        name = f"carms_singleflight_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        for group, stats in sorted(flights.items()):
+            lines.append(f'{name}{{group="{group}"}} {stats[counter]}')
+
+    batcher = embedding_batcher_stats()
+    if batcher is not None:
+        lines.append("# TYPE carms_embedding_batches_total counter")
+        lines.append(f"carms_embedding_batches_total {batcher['batches']}")
+        lines.append("# TYPE carms_embedding_batch_items_total counter")
+        lines.append(f"carms_embedding_batch_items_total {batcher['items']}")
+        lines.append("# TYPE carms_embedding_queue_depth gauge")
+        lines.append(f"carms_embedding_queue_depth {batcher['queue_depth']}")
+
+    from carms.agent.session_store import session_store_stats
+
+    stores = session_store_stats()
+    for stat, kind in (("entries", "gauge"), ("bytes", "gauge"), ("evictions", "counter")):
+        name = f"carms_session_store_{stat}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# TYPE {name} {kind}")
+        for store, stats in sorted(stores.items()):
+            lines.append(f'{name}{{store="{store}"}} {stats[stat]}')
+
+    return "\n".join(lines) + "\n"
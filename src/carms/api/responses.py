@@ -0,0 +1,45 @@
+"""High-performance JSON response class for hot API routes."""
+
+import json
+import math
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from carms.timing import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with the api extra
+    orjson = None  # type: ignore[assignment]
+
+
+def _finite(value: Any) -> Any:
+    """``value`` with NaN/inf floats replaced by ``None``, matching orjson."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [_finite(item) for item in value]
+    return value
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when available.
+
+    Routes that build plain dicts from trusted DB rows return this directly,
+    which skips FastAPI's ``response_model`` re-validation and
+    ``jsonable_encoder`` pass. NaN/inf become ``null`` rather than invalid JSON,
+    including in the stdlib fallback used when orjson is not installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            if orjson is None:
+                return json.dumps(
+                    _finite(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+                ).encode("utf-8")
+            return orjson.dumps(
+                content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
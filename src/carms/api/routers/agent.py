@@ -1,5 +1,6 @@
 """Agent chat endpoint with SSE streaming and PDF upload."""
 
+import asyncio
 import json
 import logging
 import uuid
@@ -13,6 +14,7 @@ from carms.agent.agent import (
     is_agent_available,
     store_claude_session,
 )
+from carms.agent.intents import route_message
 from carms.agent.pdf_profile import (
     MAX_UPLOAD_SIZE,
     clear_profile,
@@ -22,6 +24,7 @@ from carms.agent.pdf_profile import (
     is_valid_pdf,
 )
 from carms.api.schemas import ChatRequest, UploadResponse
+from carms.config import settings
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -93,6 +96,10 @@ async def chat(request: ChatRequest):
 
     If an applicant profile has been uploaded for this session, it is
     prepended to the user message so the agent can use it for matching.
+
+    Simple lookups ("how many programs are there", "list the schools", "show
+    program 1234") are answered by ``carms.agent.intents`` without starting
+    the agent, as the same ``text`` and ``result`` events.
     """
     if not is_agent_available():
         raise HTTPException(
@@ -102,9 +109,14 @@ async def chat(request: ChatRequest):
 
     session_id = request.session_id or str(uuid.uuid4())
 
+    if settings.agent_fast_path_enabled:
+        reply = await asyncio.to_thread(route_message, request.message)
+        if reply is not None:
+            return EventSourceResponse(_fast_path_events(session_id, reply))
+
     # Prepend applicant profile context if one exists and has content
     message = request.message
-    profile = get_profile(session_id)
+    profile = await asyncio.to_thread(get_profile, session_id)
     if profile and profile.has_content:
         message = format_profile_context(profile) + "\n\n" + message
 
@@ -134,7 +146,7 @@ async def chat(request: ChatRequest):
                                 "data": json.dumps({"text": block.text}),
                             }
                 elif isinstance(msg, ResultMessage):
-                    store_claude_session(session_id, msg.session_id)
+                    await asyncio.to_thread(store_claude_session, session_id, msg.session_id)
                     yield {
                         "event": "result",
                         "data": json.dumps(
@@ -151,7 +163,7 @@ async def chat(request: ChatRequest):
                 "event": "error",
                 "data": json.dumps({"error": "An error occurred processing your request."}),
             }
-            cleanup_session(session_id)
+            await asyncio.to_thread(cleanup_session, session_id)
         finally:
             try:
                 await client.disconnect()
@@ -161,9 +173,14 @@ async def chat(request: ChatRequest):
     return EventSourceResponse(event_generator())
 
 
+async def _fast_path_events(session_id: str, reply: str):
+    yield {"event": "text", "data": json.dumps({"text": reply})}
+    yield {"event": "result", "data": json.dumps({"session_id": session_id, "is_error": False})}
+
+
 @router.delete("/session/{session_id}")
 async def delete_session(session_id: str):
     """Clean up a chat session and any associated profile."""
-    cleanup_session(session_id)
-    clear_profile(session_id)
+    await asyncio.to_thread(cleanup_session, session_id)
+    await asyncio.to_thread(clear_profile, session_id)
     return {"status": "ok"}
@@ -5,6 +5,9 @@ from sqlalchemy import text
 from sqlmodel import Session
 
 from carms.api.deps import get_session
+from carms.config import settings
+from carms.search.embeddings import embedding_batcher_stats
+from carms.singleflight import singleflight_stats
 
 router = APIRouter(tags=["health"])
 
@@ -17,3 +20,20 @@ def health_check(session: Session = Depends(get_session)):
         return {"status": "ok", "database": "connected"}
     except Exception as e:
         return {"status": "degraded", "database": str(e)}
+
+
+@router.get("/health/embeddings")
+def embeddings_health():
+    """Query embedding micro-batching metrics (queue depth, batch sizes)."""
+    stats = embedding_batcher_stats()
+    return {
+        "enabled": settings.embedding_batch_enabled,
+        "started": stats is not None,
+        **(stats or {}),
+    }
+
+
+@router.get("/health/coalescing")
+def coalescing_stats():
+    """Single-flight metrics per group: calls, executions and coalesced requests."""
+    return {"enabled": settings.singleflight_enabled, "groups": singleflight_stats()}
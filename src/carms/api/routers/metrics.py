@@ -0,0 +1,14 @@
+"""Prometheus metrics endpoint."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from carms.api.metrics import render_prometheus
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Latency histograms per route and stage, DB pool and coalescing/batching stats."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
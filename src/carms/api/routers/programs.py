@@ -1,14 +1,129 @@
 """Program endpoints."""
 
+from dataclasses import asdict
+
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import any_
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import load_only
 from sqlmodel import Session, select
 
 from carms.api.deps import get_session
-from carms.api.schemas import ProgramDescriptionOut, ProgramDetail, ProgramSummary
+from carms.api.responses import FastJSONResponse
+from carms.api.schemas import (
+    MAX_BATCH_IDS,
+    ProgramBatchRequest,
+    ProgramDescriptionOut,
+    ProgramDetail,
+    ProgramSummary,
+    SimilarProgramOut,
+)
 from carms.db.models import Discipline, Program, ProgramDescription, School
+from carms.search.similar import find_similar_programs
 
 router = APIRouter(prefix="/programs", tags=["programs"])
 
+PROGRAM_FIELDS = tuple(ProgramDetail.model_fields)
+DESCRIPTION_SECTIONS = tuple(ProgramDescriptionOut.model_fields)
+
+
+def _parse_csv(value: str | None, allowed: tuple[str, ...], label: str) -> list[str] | None:
+    """Split a comma-separated query parameter and reject unknown names."""
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {label}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return names
+
+
+def _detail_statement(sections: list[str] | None):
+    """Build a single query for programs with their names and (optionally) description.
+
+    Only the requested description columns are loaded; the rest stay deferred so
+    large text such as ``full_markdown`` is never read unless asked for.
+    ``sections=None`` skips the description join entirely.
+    """
+    columns = [
+        Program,
+        Discipline.name.label("discipline_name"),
+        School.name.label("school_name"),
+    ]
+    if sections is not None:
+        columns.append(ProgramDescription)
+
+    stmt = (
+        select(*columns)
+        .join(Discipline, Program.discipline_id == Discipline.id)
+        .join(School, Program.school_id == School.id)
+    )
+    if sections is not None:
+        stmt = stmt.outerjoin(
+            ProgramDescription, ProgramDescription.program_id == Program.id
+        ).options(
+            load_only(
+                ProgramDescription.id,  # type: ignore[arg-type]
+                *(getattr(ProgramDescription, name) for name in sections),
+            )
+        )
+    return stmt
+
+
+def _to_detail(row, sections: list[str] | None) -> ProgramDetail:
+    """Map a row from ``_detail_statement`` to a ``ProgramDetail``.
+
+    Only the loaded sections are set on the description, so dumping with
+    ``exclude_unset`` leaves the others out of the payload.
+    """
+    prog, disc_name, school_name = row[0], row[1], row[2]
+
+    desc_out = None
+    if sections is not None and row[3] is not None:
+        desc = row[3]
+        desc_out = ProgramDescriptionOut(**{name: getattr(desc, name) for name in sections})
+
+    return ProgramDetail(
+        id=prog.id,  # type: ignore[arg-type]
+        name=prog.name,
+        discipline=disc_name,
+        school=school_name,
+        site=prog.site,
+        stream=prog.stream,
+        url=prog.url,
+        description=desc_out,
+    )
+
+
+def _resolve_fieldsets(
+    fields: str | None, sections: str | None
+) -> tuple[list[str] | None, list[str] | None]:
+    """Resolve ``fields``/``sections`` query parameters.
+
+    Returns the top-level fields to keep (``None`` for all) and the description
+    sections to load (``None`` when the description is not wanted). Asking for
+    sections implies the ``description`` field.
+    """
+    wanted_fields = _parse_csv(fields, PROGRAM_FIELDS, "fields")
+    wanted_sections = _parse_csv(sections, DESCRIPTION_SECTIONS, "sections")
+
+    if wanted_sections is not None and wanted_fields is not None:
+        if "description" not in wanted_fields:
+            wanted_fields.append("description")
+    if wanted_sections is None and (wanted_fields is None or "description" in wanted_fields):
+        wanted_sections = list(DESCRIPTION_SECTIONS)
+    if wanted_fields is not None and "description" not in wanted_fields:
+        wanted_sections = None
+    return wanted_fields, wanted_sections
+
+
+def _dump_sparse(detail: ProgramDetail, wanted_fields: list[str]) -> dict:
+    """Dump only the requested top-level fields (``id`` is always kept)."""
+    return detail.model_dump(mode="json", include={"id", *wanted_fields}, exclude_unset=True)
+
 
 @router.get("/", response_model=list[ProgramSummary])
 def list_programs(
@@ -39,68 +154,122 @@ def list_programs(
     stmt = stmt.order_by(Program.name).offset(offset).limit(limit)
     rows = session.execute(stmt).all()
 
-    return [
-        ProgramSummary(
-            id=prog.id,  # type: ignore[arg-type]
-            name=prog.name,
-            discipline=disc_name,
-            school=school_name,
-            site=prog.site,
-            stream=prog.stream,
-            url=prog.url,
+    # Rows come straight from typed columns, so skip ProgramSummary validation
+    return FastJSONResponse(
+        [
+            {
+                "id": prog.id,
+                "name": prog.name,
+                "discipline": disc_name,
+                "school": school_name,
+                "site": prog.site,
+                "stream": prog.stream,
+                "url": prog.url,
+            }
+            for prog, disc_name, school_name in rows
+        ]
+    )
+
+
+def _parse_ids(value: str) -> list[int]:
+    """Parse a comma-separated list of program IDs."""
+    try:
+        ids = [int(x) for x in value.split(",") if x.strip()]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400, detail="Invalid ids. Provide comma-separated integers."
+        ) from e
+    if not ids:
+        raise HTTPException(status_code=400, detail="At least one program id is required.")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_IDS} ids may be requested at once."
         )
-        for prog, disc_name, school_name in rows
-    ]
+    return ids
+
+
+def _batch_details(session: Session, ids: list[int], fields: str | None, sections: str | None):
+    """Fetch many programs with one ``id = ANY(:ids)`` query, in the order requested.
+
+    Unknown IDs are skipped. Duplicates are returned once.
+    """
+    wanted_fields, wanted_sections = _resolve_fieldsets(fields, sections)
+    unique_ids = list(dict.fromkeys(ids))
+
+    rows = session.execute(
+        _detail_statement(wanted_sections).where(Program.id == any_(array(unique_ids)))
+    ).all()
+
+    by_id = {row[0].id: _to_detail(row, wanted_sections) for row in rows}
+    details = [by_id[pid] for pid in unique_ids if pid in by_id]
+    if wanted_fields is not None:
+        return FastJSONResponse([_dump_sparse(d, wanted_fields) for d in details])
+    return details
+
 
+@router.get("/batch", response_model=list[ProgramDetail], response_model_exclude_unset=True)
+def get_programs_batch(
+    ids: str = Query(..., description="Comma-separated program IDs, e.g. 12,34,56"),
+    fields: str | None = Query(
+        None, description="Comma-separated top-level fields to return, e.g. name,school"
+    ),
+    sections: str | None = Query(
+        None, description="Comma-separated description sections, e.g. interviews,faq"
+    ),
+    session: Session = Depends(get_session),
+):
+    """Get many programs in one round trip."""
+    return _batch_details(session, _parse_ids(ids), fields, sections)
+
+
+@router.post("/batch", response_model=list[ProgramDetail], response_model_exclude_unset=True)
+def post_programs_batch(request: ProgramBatchRequest, session: Session = Depends(get_session)):
+    """Get many programs in one round trip (IDs and fieldsets in the request body)."""
+    return _batch_details(
+        session,
+        request.ids,
+        ",".join(request.fields) if request.fields is not None else None,
+        ",".join(request.sections) if request.sections is not None else None,
+    )
+
+
+@router.get("/{program_id}", response_model=ProgramDetail, response_model_exclude_unset=True)
+def get_program(
+    program_id: int,
+    fields: str | None = Query(
+        None, description="Comma-separated top-level fields to return, e.g. name,school"
+    ),
+    sections: str | None = Query(
+        None, description="Comma-separated description sections, e.g. interviews,faq"
+    ),
+    session: Session = Depends(get_session),
+):
+    """Get program detail, optionally restricted to a sparse set of fields/sections."""
+    wanted_fields, wanted_sections = _resolve_fieldsets(fields, sections)
 
-@router.get("/{program_id}", response_model=ProgramDetail)
-def get_program(program_id: int, session: Session = Depends(get_session)):
-    """Get program detail with full description."""
     row = session.execute(
-        select(Program, Discipline.name.label("discipline_name"), School.name.label("school_name"))
-        .join(Discipline, Program.discipline_id == Discipline.id)
-        .join(School, Program.school_id == School.id)
-        .where(Program.id == program_id)
+        _detail_statement(wanted_sections).where(Program.id == program_id)
     ).first()
 
     if not row:
         raise HTTPException(status_code=404, detail="Program not found")
 
-    prog, disc_name, school_name = row
+    detail = _to_detail(row, wanted_sections)
+    if wanted_fields is not None:
+        return FastJSONResponse(_dump_sparse(detail, wanted_fields))
+    return detail
 
-    # Get description
-    desc = session.execute(
-        select(ProgramDescription).where(ProgramDescription.program_id == program_id)
-    ).scalar_one_or_none()
 
-    desc_out = None
-    if desc:
-        desc_out = ProgramDescriptionOut(
-            program_name_section=desc.program_name_section,
-            match_iteration_name=desc.match_iteration_name,
-            program_contacts=desc.program_contacts,
-            general_instructions=desc.general_instructions,
-            supporting_documentation_information=desc.supporting_documentation_information,
-            review_process=desc.review_process,
-            interviews=desc.interviews,
-            selection_criteria=desc.selection_criteria,
-            program_highlights=desc.program_highlights,
-            program_curriculum=desc.program_curriculum,
-            training_sites=desc.training_sites,
-            additional_information=desc.additional_information,
-            return_of_service=desc.return_of_service,
-            faq=desc.faq,
-            summary_of_changes=desc.summary_of_changes,
-            full_markdown=desc.full_markdown,
-        )
+@router.get("/{program_id}/similar", response_model=list[SimilarProgramOut])
+def get_similar_programs(
+    program_id: int,
+    k: int = Query(10, ge=1, le=50),
+    same_discipline: bool = Query(False),
+    session: Session = Depends(get_session),
+):
+    """Programs most similar to this one, by precomputed centroid vectors."""
+    if session.get(Program, program_id) is None:
+        raise HTTPException(status_code=404, detail="Program not found")
 
-    return ProgramDetail(
-        id=prog.id,  # type: ignore[arg-type]
-        name=prog.name,
-        discipline=disc_name,
-        school=school_name,
-        site=prog.site,
-        stream=prog.stream,
-        url=prog.url,
-        description=desc_out,
-    )
+    results = find_similar_programs(session, program_id, k=k, same_discipline=same_discipline)
+    return FastJSONResponse([asdict(r) for r in results])
@@ -1,7 +1,16 @@
 """RAG endpoint — LangChain-powered question answering over program data."""
 
+import asyncio
+import json
+import logging
+import os
+from typing import Literal
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
+from sse_starlette.sse import EventSourceResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/rag", tags=["rag"])
 
@@ -9,6 +18,15 @@ router = APIRouter(prefix="/rag", tags=["rag"])
 class RAGRequest(BaseModel):
     question: str = Field(..., min_length=1, max_length=500)
     top_k: int = Field(default=8, ge=1, le=30)
+    mode: Literal["stuff", "map_reduce"] = Field(
+        default="stuff", description="map_reduce answers per program in parallel, then combines"
+    )
+    # map_reduce only; without them, discipline/school names in the question are used
+    discipline_id: int | None = None
+    school_id: int | None = None
+    site: str | None = None
+    stream: str | None = None
+    max_programs: int | None = Field(default=None, ge=1, le=50)
 
 
 class RAGSource(BaseModel):
@@ -24,24 +42,87 @@ class RAGResponse(BaseModel):
     question: str
     answer: str
     sources: list[RAGSource]
+    cache: str | None = Field(
+        default=None, description="hit, hit_persistent, miss or bypass (answer cache status)"
+    )
+    programs: int | None = Field(default=None, description="Programs mapped (map_reduce)")
 
 
-@router.post("/ask", response_model=RAGResponse)
-def rag_ask(request: RAGRequest):
-    """Answer a question using LangChain RAG over CaRMS program descriptions."""
-    import os
-
+def _require_api_key() -> None:
     if not os.environ.get("ANTHROPIC_API_KEY"):
         raise HTTPException(
             status_code=503,
             detail="RAG not available. Set ANTHROPIC_API_KEY to enable.",
         )
 
-    from carms.search.rag import ask
 
-    result = ask(question=request.question, k=request.top_k)
+@router.post("/ask", response_model=RAGResponse)
+async def rag_ask(request: RAGRequest):
+    """Answer a question using LangChain RAG over CaRMS program descriptions."""
+    _require_api_key()
+
+    if request.mode == "map_reduce":
+        from carms.search.map_reduce import amap_reduce_ask
+
+        result = await amap_reduce_ask(
+            request.question,
+            discipline_id=request.discipline_id,
+            school_id=request.school_id,
+            site=request.site,
+            stream=request.stream,
+            max_programs=request.max_programs,
+        )
+    else:
+        from carms.search.rag import ask
+
+        # Blocking chain (coalesced across threads); keep it off the event loop
+        result = await asyncio.to_thread(ask, question=request.question, k=request.top_k)
+
     return RAGResponse(
         question=request.question,
         answer=result["answer"],
         sources=[RAGSource(**s) for s in result["sources"]],
+        cache=result.get("cache"),
+        programs=result.get("programs"),
     )
+
+
+@router.post("/ask/stream")
+async def rag_ask_stream(request: RAGRequest):
+    """Stream a RAG answer via SSE.
+
+    Emits one ``sources`` event when retrieval finishes, a ``token`` event per
+    generated chunk, then ``done`` with the full answer and cache status (or
+    ``error``). On a cache hit the answer arrives as a single ``token``.
+    Only ``stuff`` mode is streamed; map-reduce options are rejected.
+    """
+    map_reduce_options = ("discipline_id", "school_id", "site", "stream", "max_programs")
+    if request.mode != "stuff" or any(
+        getattr(request, option) is not None for option in map_reduce_options
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="Streaming supports mode='stuff' only; use /rag/ask for map_reduce.",
+        )
+    _require_api_key()
+
+    from carms.search.rag import astream_answer
+
+    async def event_generator():
+        try:
+            async for event, payload in astream_answer(request.question, k=request.top_k):
+                if event == "sources":
+                    data = {"sources": payload}
+                elif event == "token":
+                    data = {"text": payload}
+                else:
+                    data = {"question": request.question, **payload}
+                yield {"event": event, "data": json.dumps(data)}
+        except Exception as e:
+            logger.error("RAG stream error: %s", e)
+            yield {
+                "event": "error",
+                "data": json.dumps({"error": "An error occurred generating the answer."}),
+            }
+
+    return EventSourceResponse(event_generator())
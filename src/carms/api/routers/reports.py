@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
 
 from carms.api.deps import get_session
+from carms.api.responses import FastJSONResponse
 from carms.reports.registry import get_report, list_reports
 
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -21,4 +22,4 @@ def reports_generate(name: str, session: Session = Depends(get_session)):
     report = get_report(name)
     if report is None:
         raise HTTPException(status_code=404, detail=f"Report '{name}' not found")
-    return report.to_json(session)
+    return FastJSONResponse(report.to_json(session))
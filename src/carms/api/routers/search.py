@@ -1,10 +1,13 @@
 """Semantic search endpoint."""
 
+from dataclasses import asdict
+
 from fastapi import APIRouter, Depends
 from sqlmodel import Session
 
 from carms.api.deps import get_search_service, get_session
-from carms.api.schemas import SearchRequest, SearchResponse, SearchResultOut
+from carms.api.responses import FastJSONResponse
+from carms.api.schemas import SearchRequest, SearchResponse
 
 router = APIRouter(prefix="/search", tags=["search"])
 
@@ -22,23 +25,23 @@ def search_programs(
         discipline_id=request.discipline_id,
         school_id=request.school_id,
         site=request.site,
+        stream=request.stream,
+        group_by=request.group_by,
+        chunks_per_program=request.chunks_per_program,
+        mode=request.mode,
+        facets=request.facets,
     )
 
-    return SearchResponse(
-        query=request.query,
-        results=[
-            SearchResultOut(
-                program_id=r.program_id,
-                program_name=r.program_name,
-                discipline=r.discipline,
-                school=r.school,
-                site=r.site,
-                stream=r.stream,
-                chunk_text=r.chunk_text,
-                similarity=r.similarity,
-                url=r.url,
-            )
-            for r in results
-        ],
-        count=len(results),
-    )
+    # SearchResult rows are trusted, so skip SearchResponse validation
+    content = {
+        "query": request.query,
+        "results": [asdict(r) for r in results],
+        "count": len(results),
+        # True when the embedding stage failed or missed its budget and lexical was used
+        "degraded": service.last_plan is not None and service.last_plan.degraded is not None,
+    }
+    if request.facets:
+        content["facets"] = service.last_facets
+    if request.debug and service.last_plan is not None:
+        content["debug"] = {"plan": asdict(service.last_plan)}
+    return FastJSONResponse(content)
@@ -1,5 +1,7 @@
 """Pydantic request/response models for the API."""
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 # --- Disciplines ---
@@ -56,6 +58,27 @@ class ProgramDetail(ProgramSummary):
     description: ProgramDescriptionOut | None = None
 
 
+class SimilarProgramOut(BaseModel):
+    program_id: int
+    program_name: str
+    discipline: str
+    school: str
+    site: str
+    stream: str
+    similarity: float
+    url: str | None = None
+
+
+# Most program ids one batch request (GET ?ids= or POST /programs/batch) may ask for
+MAX_BATCH_IDS = 200
+
+
+class ProgramBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+    fields: list[str] | None = None
+    sections: list[str] | None = None
+
+
 # --- Search ---
 
 
@@ -65,6 +88,16 @@ class SearchRequest(BaseModel):
     discipline_id: int | None = None
     school_id: int | None = None
     site: str | None = None
+    stream: str | None = Field(default=None, description="CMG or IMG")
+    mode: Literal["vector", "lexical", "hybrid"] = Field(
+        default="vector", description="lexical skips the embedding call entirely"
+    )
+    group_by: Literal["program"] | None = Field(
+        default=None, description="Return distinct programs instead of raw chunks"
+    )
+    chunks_per_program: int = Field(default=1, ge=1, le=5)
+    facets: bool = Field(default=False, description="Include discipline/school/site/stream counts")
+    debug: bool = Field(default=False, description="Include the search plan in the response")
 
 
 class SearchResultOut(BaseModel):
@@ -77,12 +110,21 @@ class SearchResultOut(BaseModel):
     chunk_text: str
     similarity: float
     url: str | None = None
+    snippets: list[str] | None = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
 
 
 class SearchResponse(BaseModel):
     query: str
     results: list[SearchResultOut]
     count: int
+    degraded: bool = False
+    facets: dict[str, list[FacetCount]] | None = None
+    debug: dict | None = None
 
 
 # --- Analytics ---
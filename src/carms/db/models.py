@@ -1,9 +1,12 @@
 """SQLModel database tables for CaRMS program data."""
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Column, Index
+from sqlalchemy import Column, Computed, Index
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
+from carms.config import settings
+
 
 class Discipline(SQLModel, table=True):
     __tablename__ = "disciplines"
@@ -81,15 +84,78 @@ class ProgramEmbedding(SQLModel, table=True):
     description_id: int = Field(foreign_key="program_descriptions.id", index=True)
     chunk_index: int = Field(default=0)
     chunk_text: str
+
+    # Denormalized from programs so search can filter without joining
+    discipline_id: int | None = Field(default=None, index=True)
+    school_id: int | None = Field(default=None, index=True)
+    site_normalized: str | None = Field(default=None, index=True)
+    is_cmg: bool = Field(default=False)
+    is_img: bool = Field(default=False)
+
     embedding: list[float] | None = Field(
         default=None,
-        sa_column=Column(Vector(1536)),
+        sa_column=Column(Vector(settings.embedding_dim)),
+    )
+    # Full-text search vector, generated by Postgres from chunk_text
+    chunk_tsv: str | None = Field(
+        default=None,
+        sa_column=Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', chunk_text)", persisted=True),
+        ),
     )
 
     program: Program | None = Relationship(back_populates="embeddings")
     description: ProgramDescription | None = Relationship(back_populates="embeddings")
 
 
+class ProgramCentroid(SQLModel, table=True):
+    """Mean of a program's chunk embeddings, for program-to-program similarity."""
+
+    __tablename__ = "program_centroids"
+
+    program_id: int = Field(foreign_key="programs.id", primary_key=True)
+    discipline_id: int = Field(index=True)
+    chunk_count: int = Field(default=0)
+    centroid: list[float] | None = Field(
+        default=None,
+        sa_column=Column(Vector(settings.embedding_dim)),
+    )
+
+
+class ProgramDigest(SQLModel, table=True):
+    """Key facts per description section (see ``carms.search.digests``)."""
+
+    __tablename__ = "program_digests"
+
+    program_id: int = Field(foreign_key="programs.id", primary_key=True)
+    digest: dict = Field(default_factory=dict, sa_column=Column(JSONB, nullable=False))
+    summarizer: str
+    source_hash: str  # section text + summarizer; unchanged programs are not re-summarized
+
+
+class RAGAnswerCacheEntry(SQLModel, table=True):
+    """Persistent tier of the RAG answer cache (see ``carms.search.answer_cache``)."""
+
+    __tablename__ = "rag_answer_cache"
+
+    key: str = Field(primary_key=True)
+    question: str
+    answer: str
+    created_at: float = Field(index=True)  # Unix time, compared against RAG_CACHE_TTL_SECONDS
+
+
+class AgentSessionEntry(SQLModel, table=True):
+    """Shared agent session state (see ``carms.agent.session_store``)."""
+
+    __tablename__ = "agent_sessions"
+
+    store: str = Field(primary_key=True)  # e.g. "claude_sessions", "profiles"
+    key: str = Field(primary_key=True)
+    value: str  # JSON
+    expires_at: float = Field(index=True)  # Unix time
+
+
 # HNSW index for cosine similarity search
 embedding_index = Index(
     "ix_program_embeddings_hnsw",
@@ -98,3 +164,19 @@ embedding_index = Index(
     postgresql_with={"m": 16, "ef_construction": 64},
     postgresql_ops={"embedding": "vector_cosine_ops"},
 )
+
+# GIN index for lexical (full-text) search
+chunk_tsv_index = Index(
+    "ix_program_embeddings_chunk_tsv",
+    ProgramEmbedding.chunk_tsv,  # type: ignore[arg-type]
+    postgresql_using="gin",
+)
+
+# HNSW index for program-to-program similarity
+centroid_index = Index(
+    "ix_program_centroids_hnsw",
+    ProgramCentroid.centroid,  # type: ignore[arg-type]
+    postgresql_using="hnsw",
+    postgresql_with={"m": 16, "ef_construction": 64},
+    postgresql_ops={"centroid": "vector_cosine_ops"},
+)
@@ -0,0 +1,77 @@
+"""Program digest asset - precompute key facts per description section."""
+
+from dagster import AssetExecutionContext, AssetIn, asset
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from carms.db.models import ProgramDigest
+from carms.etl.resources import DatabaseResource, SummarizerResource
+from carms.search.digests import DIGEST_SECTIONS, digest_sections, source_hash
+
+COMMIT_EVERY = 200
+
+
+@asset(
+    group_name="digests",
+    ins={"stg_descriptions": AssetIn()},
+    compute_kind="python",
+)
+def program_digests(
+    context: AssetExecutionContext,
+    database: DatabaseResource,
+    summarizer: SummarizerResource,
+    stg_descriptions: int,
+) -> int:
+    """Summarize each program's description sections into a compact digest.
+
+    Programs whose sections (and summarizer) are unchanged since the last run
+    keep their digest, so re-running with the LLM summarizer only pays for
+    what changed.
+    """
+    engine = database.get_engine()
+    SQLModel.metadata.create_all(engine, tables=[ProgramDigest.__table__])
+    digester = summarizer.get_summarizer()
+    columns = list(DIGEST_SECTIONS)
+
+    with database.get_session() as session:
+        known = dict(
+            session.execute(text("SELECT program_id, source_hash FROM program_digests")).all()
+        )
+        rows = session.execute(
+            text(f"SELECT program_id, {', '.join(columns)} FROM program_descriptions")
+        ).fetchall()
+
+        seen: set[int] = set()
+        written = 0
+        for program_id, *values in rows:
+            seen.add(program_id)
+            sections = digest_sections(dict(zip(columns, values)))
+            digest_hash = source_hash(sections, digester)
+            if known.get(program_id) == digest_hash:
+                continue
+
+            session.merge(
+                ProgramDigest(
+                    program_id=program_id,
+                    digest=digester.summarize(sections),
+                    summarizer=digester.name,
+                    source_hash=digest_hash,
+                )
+            )
+            written += 1
+            if written % COMMIT_EVERY == 0:
+                session.commit()
+                context.log.info(f"Digests written: {written}")
+
+        stale = [program_id for program_id in known if program_id not in seen]
+        if stale:
+            session.execute(
+                text("DELETE FROM program_digests WHERE program_id = ANY(:ids)"), {"ids": stale}
+            )
+        session.commit()
+
+    context.log.info(
+        f"Done: {len(seen)} digests with {digester.name} "
+        f"({written} updated, {len(seen) - written} unchanged, {len(stale)} removed)"
+    )
+    return len(seen)
@@ -5,8 +5,10 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from sqlalchemy import text
 from sqlmodel import SQLModel
 
-from carms.db.models import ProgramEmbedding
+from carms.config import settings
+from carms.db.models import ProgramCentroid, ProgramEmbedding
 from carms.etl.resources import DatabaseResource, EmbeddingResource
+from carms.search.vector_index import index_ddl, index_name
 
 EMBED_BATCH_SIZE = 500
 
@@ -33,12 +35,21 @@ def program_embeddings(
     SQLModel.metadata.create_all(engine, tables=[ProgramEmbedding.__table__])
 
     with engine.connect() as conn:
+        if settings.vector_index_mode != "full":
+            # Replace the full-precision HNSW index (created with the table) by a compact one
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name('full')}"))
+        conn.execute(
+            text(
+                index_ddl(
+                    settings.vector_index_mode, settings.embedding_dim, settings.vector_index_dim
+                )
+            )
+        )
         conn.execute(
             text("""
-                CREATE INDEX IF NOT EXISTS ix_program_embeddings_hnsw
+                CREATE INDEX IF NOT EXISTS ix_program_embeddings_chunk_tsv
                 ON program_embeddings
-                USING hnsw (embedding vector_cosine_ops)
-                WITH (m = 16, ef_construction = 64)
+                USING gin (chunk_tsv)
             """)
         )
         conn.commit()
@@ -53,8 +64,12 @@ def program_embeddings(
         # Stream rows one at a time to avoid loading all markdown into memory
         result = session.execute(
             text("""
-                SELECT pd.id, pd.program_id, pd.full_markdown
+                SELECT
+                    pd.id, pd.program_id, pd.full_markdown,
+                    p.discipline_id, p.school_id, LOWER(TRIM(p.site)),
+                    p.stream ILIKE '%CMG%', p.stream ILIKE '%IMG%'
                 FROM program_descriptions pd
+                JOIN programs p ON pd.program_id = p.id
                 WHERE pd.full_markdown IS NOT NULL
             """)
         )
@@ -63,8 +78,9 @@ def program_embeddings(
         chunk_buffer: list[dict] = []
         program_count = 0
 
-        for desc_id, program_id, markdown in result:
+        for desc_id, program_id, markdown, *filter_cols in result:
             program_count += 1
+            discipline_id, school_id, site_normalized, is_cmg, is_img = filter_cols
             chunks = splitter.split_text(markdown)
             for i, chunk_text in enumerate(chunks):
                 chunk_buffer.append(
@@ -73,6 +89,12 @@ def program_embeddings(
                         "description_id": desc_id,
                         "chunk_index": i,
                         "chunk_text": chunk_text,
+                        # Denormalized filter columns for join-free search
+                        "discipline_id": discipline_id,
+                        "school_id": school_id,
+                        "site_normalized": site_normalized,
+                        "is_cmg": bool(is_cmg),
+                        "is_img": bool(is_img),
                     }
                 )
 
@@ -99,6 +121,44 @@ def program_embeddings(
     return total_chunks
 
 
+@asset(
+    group_name="embeddings",
+    ins={"program_embeddings": AssetIn()},
+    compute_kind="postgres",
+)
+def program_centroids(
+    context: AssetExecutionContext,
+    database: DatabaseResource,
+    program_embeddings: int,
+) -> int:
+    """Average each program's chunk embeddings into one centroid vector."""
+    engine = database.get_engine()
+
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS program_centroids"))
+        conn.commit()
+
+    # Table and HNSW index come from the model definition
+    SQLModel.metadata.create_all(engine, tables=[ProgramCentroid.__table__])
+
+    with database.get_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO program_centroids (program_id, discipline_id, chunk_count, centroid)
+                SELECT pe.program_id, p.discipline_id, COUNT(*), AVG(pe.embedding)
+                FROM program_embeddings pe
+                JOIN programs p ON pe.program_id = p.id
+                WHERE pe.embedding IS NOT NULL
+                GROUP BY pe.program_id, p.discipline_id
+            """)
+        )
+        count = session.execute(text("SELECT COUNT(*) FROM program_centroids")).scalar_one()
+        session.commit()
+
+    context.log.info(f"Computed {count} program centroids")
+    return count
+
+
 def _embed_and_insert(
     session,
     embedding_resource: EmbeddingResource,
@@ -116,6 +176,11 @@ def _embed_and_insert(
                 description_id=chunk["description_id"],
                 chunk_index=chunk["chunk_index"],
                 chunk_text=chunk["chunk_text"],
+                discipline_id=chunk["discipline_id"],
+                school_id=chunk["school_id"],
+                site_normalized=chunk["site_normalized"],
+                is_cmg=chunk["is_cmg"],
+                is_img=chunk["is_img"],
                 embedding=vector,
             )
         )
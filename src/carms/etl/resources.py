@@ -1,10 +1,12 @@
 """Dagster resources for database and embedding operations."""
 
 from dagster import ConfigurableResource
-from langchain_openai import OpenAIEmbeddings
 from sqlalchemy import create_engine
 from sqlmodel import Session
 
+from carms.search.digests import Summarizer, create_summarizer
+from carms.search.embeddings import EmbeddingProvider, create_embedding_provider
+
 
 class DatabaseResource(ConfigurableResource):
     """Database connection resource."""
@@ -19,25 +21,44 @@ class DatabaseResource(ConfigurableResource):
 
 
 class EmbeddingResource(ConfigurableResource):
-    """OpenAI embedding resource using text-embedding-3-small."""
+    """Embedding resource backed by the configured provider (OpenAI or local CPU)."""
 
+    backend: str = "openai"
     model_name: str = "text-embedding-3-small"
+    dimension: int = 1536
     openai_api_key: str = ""
+    runtime: str = "torch"
 
-    _model: OpenAIEmbeddings | None = None
+    _provider: EmbeddingProvider | None = None
 
-    def _get_model(self) -> OpenAIEmbeddings:
-        if self._model is None:
+    def _get_provider(self) -> EmbeddingProvider:
+        if self._provider is None:
             object.__setattr__(
                 self,
-                "_model",
-                OpenAIEmbeddings(
+                "_provider",
+                create_embedding_provider(
+                    backend=self.backend,
                     model=self.model_name,
+                    dimension=self.dimension,
                     openai_api_key=self.openai_api_key,
+                    runtime=self.runtime,
                 ),
             )
-        return self._model  # type: ignore[return-value]
+        return self._provider  # type: ignore[return-value]
 
     def embed(self, texts: list[str]) -> list[list[float]]:
-        model = self._get_model()
-        return model.embed_documents(texts)
+        provider = self._get_provider()
+        return provider.embed_documents(texts)
+
+
+class SummarizerResource(ConfigurableResource):
+    """Digest summarizer resource (deterministic extractive, or the RAG chat model)."""
+
+    backend: str = "extractive"
+
+    _summarizer: Summarizer | None = None
+
+    def get_summarizer(self) -> Summarizer:
+        if self._summarizer is None:
+            object.__setattr__(self, "_summarizer", create_summarizer(self.backend))
+        return self._summarizer  # type: ignore[return-value]
@@ -8,6 +8,9 @@ from pathlib import Path
 import pandas as pd
 from sqlmodel import Session
 
+from carms.singleflight import get_flight
+from carms.timing import span
+
 
 @dataclass
 class ReportMetadata:
@@ -37,8 +40,16 @@ class BaseReport(ABC):
         """Run the report query and return a DataFrame."""
 
     def to_json(self, session: Session) -> dict:
-        """Generate the report and return as JSON-serializable dict."""
-        df = self.generate(session)
+        """Generate the report and return as JSON-serializable dict.
+
+        Concurrent requests for the same report share one generation, so the
+        returned dict must not be mutated.
+        """
+        return get_flight("reports").do(self.name, lambda: self._build_json(session))
+
+    def _build_json(self, session: Session) -> dict:
+        with span(f"report.{self.name}"):
+            df = self.generate(session)
         metadata = ReportMetadata(
             name=self.name,
             title=self.title,
@@ -0,0 +1,162 @@
+"""Answer cache for RAG, keyed on the question *and* the evidence behind it.
+
+The key combines the normalized question, ``top_k``, the retrieved passages
+(program id + text hash), the dataset version and the model/prompt. An entry
+is therefore only reused when the same question would be answered from the
+same evidence; after an ETL refresh the evidence or dataset version changes
+and old entries simply stop matching.
+
+Two tiers:
+
+- memory: per-process LRU with a TTL (``RAG_CACHE_SIZE``, ``RAG_CACHE_TTL_SECONDS``)
+- persistent (``RAG_CACHE_PERSISTENT=true``): the ``rag_answer_cache`` table,
+  shared by every worker and surviving restarts
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+from carms.config import settings
+from carms.db.engine import engine
+from carms.db.models import RAGAnswerCacheEntry
+from carms.search.embeddings import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Cache status values reported to clients
+HIT = "hit"
+HIT_PERSISTENT = "hit_persistent"
+MISS = "miss"
+BYPASS = "bypass"
+
+
+def dataset_version(session: Session) -> str:
+    """Identifier that changes whenever ``program_embeddings`` is rebuilt.
+
+    The ETL drops and recreates the table, so its OID changes on every run;
+    the max id covers incremental inserts.
+    """
+    row = session.execute(
+        text("""
+            SELECT
+                CAST(to_regclass('program_embeddings') AS oid)::bigint,
+                (SELECT MAX(id) FROM program_embeddings)
+        """)
+    ).one()
+    return f"{row[0]}:{row[1]}"
+
+
+def answer_cache_key(
+    question: str,
+    k: int,
+    evidence: list[tuple[int | None, str]],
+    version: str,
+    generator: str,
+) -> str:
+    """Stable key for an answer.
+
+    ``evidence`` is ``(program_id, passage text)`` per retrieved passage;
+    ``generator`` identifies the model and prompt that produce the answer.
+    """
+    passages = sorted(
+        f"{program_id}:{hashlib.sha1(passage.encode()).hexdigest()}"
+        for program_id, passage in evidence
+    )
+    payload = json.dumps([normalize_query(question), k, passages, version, generator])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class AnswerCache:
+    """LRU + TTL answer cache with an optional Postgres tier."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float, persistent: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl_seconds
+        self.persistent = persistent
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def get(self, key: str) -> tuple[str | None, str]:
+        """Return ``(answer, status)``; ``answer`` is ``None`` on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    return entry[1], HIT
+                del self._entries[key]
+
+        if self.persistent:
+            answer, created_at = self._load(key, now)
+            if answer is not None:
+                self._remember(key, answer, created_at)
+                return answer, HIT_PERSISTENT
+        return None, MISS
+
+    def put(self, key: str, question: str, answer: str) -> None:
+        now = time.time()
+        self._remember(key, answer, now)
+        if self.persistent:
+            self._store(key, question, answer, now)
+
+    def clear(self) -> None:
+        """Empty the memory tier."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, answer: str, created_at: float) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (created_at, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _ensure_table(self) -> None:
+        if not self._table_ready:
+            SQLModel.metadata.create_all(engine, tables=[RAGAnswerCacheEntry.__table__])
+            self._table_ready = True
+
+    def _load(self, key: str, now: float) -> tuple[str | None, float]:
+        try:
+            self._ensure_table()
+            with Session(engine) as session:
+                entry = session.get(RAGAnswerCacheEntry, key)
+        except Exception as e:
+            logger.warning("RAG answer cache lookup failed: %s", e)
+            return None, now
+        if entry is None or now - entry.created_at > self.ttl:
+            return None, now
+        return entry.answer, entry.created_at
+
+    def _store(self, key: str, question: str, answer: str, now: float) -> None:
+        try:
+            self._ensure_table()
+            with Session(engine) as session:
+                session.merge(
+                    RAGAnswerCacheEntry(key=key, question=question, answer=answer, created_at=now)
+                )
+                session.execute(
+                    text("DELETE FROM rag_answer_cache WHERE created_at < :cutoff"),
+                    {"cutoff": now - self.ttl},
+                )
+                session.commit()
+        except Exception as e:
+            logger.warning("RAG answer cache write failed: %s", e)
+
+
+answer_cache = AnswerCache(
+    maxsize=settings.rag_cache_size,
+    ttl_seconds=settings.rag_cache_ttl_seconds,
+    persistent=settings.rag_cache_persistent,
+)
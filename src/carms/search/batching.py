@@ -0,0 +1,142 @@
+"""Dynamic micro-batching for query embeddings.
+
+Concurrent ``embed_query`` calls (from FastAPI's threadpool or agent tools)
+are queued and embedded together with one ``embed_documents`` call per batch.
+A batch is dispatched when it reaches ``max_batch_size`` or ``max_wait_ms``
+after its first item arrived. Callers block on a ``Future`` for their vector.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from carms.search.embeddings import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class BatcherStats:
+    """Counters exposed as metrics."""
+
+    batches: int = 0
+    items: int = 0
+    max_batch_size: int = 0
+    last_batch_size: int = 0
+    errors: int = 0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return round(self.items / self.batches, 2) if self.batches else 0.0
+
+
+class EmbeddingBatcher:
+    """Gathers concurrent query embeddings into batches on worker threads."""
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        workers: int = 2,
+    ):
+        self.provider = provider
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._stats = BatcherStats()
+        self._stats_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"embedding-batcher-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue ``text`` for embedding and return a future for its vector."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed_query(self, text: str, timeout: float | None = None) -> list[float]:
+        """Embed ``text`` as part of the next batch, blocking until it is ready."""
+        return self.submit(text).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        """Snapshot of batching metrics."""
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._stats.batches,
+                "items": self._stats.items,
+                "avg_batch_size": self._stats.avg_batch_size,
+                "max_batch_size": self._stats.max_batch_size,
+                "last_batch_size": self._stats.last_batch_size,
+                "errors": self._stats.errors,
+            }
+
+    def close(self) -> None:
+        """Stop the worker threads after the queue drains."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def _collect(self) -> list[tuple[str, Future]] | None:
+        """Block for the first item, then gather more until full or the wait expires."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # let this worker finish the batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.provider.embed_documents(texts)
+            except Exception as e:
+                logger.warning("Embedding batch of %d failed: %s", len(batch), e)
+                with self._stats_lock:
+                    self._stats.errors += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self._stats.batches += 1
+                self._stats.items += len(batch)
+                self._stats.last_batch_size = len(batch)
+                self._stats.max_batch_size = max(self._stats.max_batch_size, len(batch))
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
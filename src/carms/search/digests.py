@@ -0,0 +1,226 @@
+"""Compact per-program digests of description sections.
+
+A digest lists a few key facts per section (selection criteria, interviews,
+return of service, training sites, ...), precomputed by the
+``program_digests`` ETL asset and stored in ``program_digests``. The agent's
+detail and comparison tools send digests by default and full section text
+only when asked, so the model reads a few hundred characters per program
+instead of several thousand.
+
+Summarizers are pluggable, selected with ``DIGEST_SUMMARIZER``:
+
+- ``extractive`` (default): deterministic, local keyword scoring that keeps
+  the most informative sentences of each section verbatim. No network.
+- ``llm``: asks the RAG chat model for the facts, one call per program,
+  falling back to ``extractive`` when its reply can't be parsed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import textwrap
+from typing import Protocol
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from carms.config import settings
+
+logger = logging.getLogger(__name__)
+
+# program_descriptions column -> digest key (the agent tools' section names)
+DIGEST_SECTIONS = {
+    "selection_criteria": "selection_criteria",
+    "interviews": "interviews",
+    "return_of_service": "return_of_service",
+    "training_sites": "training_sites",
+    "review_process": "review_process",
+    "supporting_documentation_information": "supporting_docs",
+    "program_highlights": "highlights",
+    "program_curriculum": "curriculum",
+}
+
+# Words that mark a sentence as a useful fact for each section ("|"-separated)
+SECTION_KEYWORDS = {
+    key: tuple(words.split("|"))
+    for key, words in {
+        "selection_criteria": "require|must|eligib|criteria|experience|elective|research"
+        "|letter|reference|language|citizen|resident|licens",
+        "interviews": "interview|virtual|in-person|in person|online|zoom|panel|mmi|invit|date"
+        "|january|february|march",
+        "return_of_service": "return of service|year|require|obligat|agreement"
+        "|not applicable|no return",
+        "training_sites": "site|hospital|rural|urban|community|rotation|campus|centre|center"
+        "|distributed",
+        "review_process": "review|file|score|committee|rank|assess|weight",
+        "supporting_docs": "letter|reference|cv|personal|transcript|mspr|photo|language"
+        "|required|optional",
+        "highlights": "unique|opportunit|research|mentor|wellness|funding",
+        "curriculum": "pgy|rotation|block|year|academic|elective|call",
+    }.items()
+}
+
+_MARKUP = re.compile(r"^\s*(?:#+\s*|[-*•]\s+|\d+[.)]\s+)|\*\*|__|`")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z(])")
+MIN_FACT_CHARS = 20
+
+
+class Summarizer(Protocol):
+    """Anything that turns a program's sections into key facts per section."""
+
+    name: str
+    max_facts: int
+    fact_chars: int
+
+    def summarize(self, sections: dict[str, str]) -> dict[str, list[str]]: ...
+
+
+def _units(section_text: str) -> list[str]:
+    """Candidate facts: list items and sentences, stripped of markdown markup."""
+    units = []
+    for line in section_text.splitlines():
+        if line.lstrip().startswith("#"):
+            continue
+        line = _MARKUP.sub("", line).strip()
+        for sentence in _SENTENCE_END.split(line):
+            sentence = " ".join(sentence.split())
+            if sentence and sentence not in units:
+                units.append(sentence)
+    return units
+
+
+def _score(unit: str, keywords: tuple[str, ...]) -> int:
+    lowered = unit.lower()
+    score = 2 * sum(keyword in lowered for keyword in keywords)
+    if any(ch.isdigit() for ch in unit):
+        score += 1  # dates, counts, durations
+    return score
+
+
+class ExtractiveSummarizer:
+    """Keep each section's highest-scoring sentences, in their original order.
+
+    Deterministic: the same section text always yields the same facts.
+    """
+
+    name = "extractive-v1"
+
+    def __init__(self, max_facts: int = 3, fact_chars: int = 160):
+        self.max_facts = max_facts
+        self.fact_chars = fact_chars
+
+    def summarize(self, sections: dict[str, str]) -> dict[str, list[str]]:
+        digest = {}
+        for key, section_text in sections.items():
+            keywords = SECTION_KEYWORDS.get(key, ())
+            units = _units(section_text)
+            scores = [_score(unit, keywords) for unit in units]
+            # Highest score first, earlier sentences win ties. Units without a keyword
+            # are dropped unless none match; then the first full sentence stands in
+            ranked = sorted(
+                (i for i, score in enumerate(scores) if score), key=lambda i: (-scores[i], i)
+            )
+            if not ranked:
+                ranked = [i for i, unit in enumerate(units) if len(unit) >= MIN_FACT_CHARS][:1]
+            chosen = sorted(ranked[: self.max_facts])
+            facts = [textwrap.shorten(units[i], self.fact_chars, placeholder="…") for i in chosen]
+            if facts:
+                digest[key] = facts
+        return digest
+
+
+DIGEST_PROMPT = """You are summarizing one Canadian residency program description (CaRMS).
+For each section below, list at most {max_facts} key facts an applicant needs
+(requirements, dates, formats, durations, obligations), each under {fact_chars} characters.
+Use only what the text says. Reply with a JSON object mapping each section name to a
+list of strings, and nothing else.
+
+{sections}"""
+
+
+class LLMSummarizer:
+    """Key facts written by the RAG chat model, one call per program."""
+
+    def __init__(self, max_facts: int = 3, fact_chars: int = 160):
+        from carms.search.rag import RAG_MODEL
+
+        self.name = f"llm:{RAG_MODEL}"
+        self.max_facts = max_facts
+        self.fact_chars = fact_chars
+        self._fallback = ExtractiveSummarizer(max_facts, fact_chars)
+
+    def summarize(self, sections: dict[str, str]) -> dict[str, list[str]]:
+        from carms.search.rag import get_llm, message_text
+
+        if not sections:
+            return {}
+        prompt = DIGEST_PROMPT.format(
+            max_facts=self.max_facts,
+            fact_chars=self.fact_chars,
+            sections="\n\n".join(f"## {key}\n{value}" for key, value in sections.items()),
+        )
+        reply = message_text(get_llm().invoke(prompt)).strip()
+        try:
+            parsed = json.loads(reply[reply.index("{") : reply.rindex("}") + 1])
+        except ValueError:
+            parsed = None
+        if not isinstance(parsed, dict):
+            logger.warning("Unparseable digest reply, using extractive summary instead")
+            return self._fallback.summarize(sections)
+
+        digest = {}
+        for key in sections:
+            facts = parsed.get(key)
+            if isinstance(facts, list):
+                facts = [
+                    textwrap.shorten(str(fact), self.fact_chars, placeholder="…")
+                    for fact in facts[: self.max_facts]
+                    if str(fact).strip()
+                ]
+                if facts:
+                    digest[key] = facts
+        return digest
+
+
+def create_summarizer(
+    backend: str, max_facts: int | None = None, fact_chars: int | None = None
+) -> Summarizer:
+    """Build a summarizer for the given backend name."""
+    max_facts = max_facts or settings.digest_max_facts
+    fact_chars = fact_chars or settings.digest_fact_chars
+    if backend == "extractive":
+        return ExtractiveSummarizer(max_facts, fact_chars)
+    if backend == "llm":
+        return LLMSummarizer(max_facts, fact_chars)
+    raise ValueError(f"Unknown digest summarizer: {backend!r} (expected 'extractive' or 'llm')")
+
+
+def digest_sections(row: dict[str, str | None]) -> dict[str, str]:
+    """Non-empty digest sections of a ``program_descriptions`` row, by digest key."""
+    return {
+        key: row[column].strip()
+        for column, key in DIGEST_SECTIONS.items()
+        if row.get(column) and row[column].strip()
+    }
+
+
+def source_hash(sections: dict[str, str], summarizer: Summarizer) -> str:
+    """Changes when the section text, the summarizer or its limits do, so digests can be reused."""
+    limits = [summarizer.max_facts, summarizer.fact_chars]
+    payload = json.dumps([summarizer.name, limits, sections], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_digests(session: Session, program_ids: list[int]) -> dict[int, dict[str, list[str]]]:
+    """Digests by program id; empty if the ETL hasn't built ``program_digests`` yet."""
+    exists = session.execute(text("SELECT to_regclass('program_digests') IS NOT NULL")).scalar()
+    if not exists or not program_ids:
+        return {}
+    rows = session.execute(
+        text("SELECT program_id, digest FROM program_digests WHERE program_id = ANY(:ids)"),
+        {"ids": list(program_ids)},
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
@@ -1,22 +1,254 @@
-"""Embedding model management for search queries."""
+"""Embedding providers for search queries and ETL.
 
-from functools import lru_cache
+Two backends are available, selected with ``EMBEDDING_BACKEND``:
 
-from langchain_openai import OpenAIEmbeddings
+- ``openai`` (default): remote ``OpenAIEmbeddings`` via LangChain.
+- ``local``: a sentence-transformers model on CPU (optionally ONNX runtime),
+  loaded once per process. No network or API key needed.
+
+``EMBEDDING_MODEL`` names the model for either backend and ``EMBEDDING_DIM``
+must match its output size; it also sizes ``program_embeddings.embedding``.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Protocol
 
 from carms.config import settings
+from carms.search.batching import EmbeddingBatcher
+from carms.timing import timed
+
+
+class EmbeddingProvider(Protocol):
+    """Anything that can embed queries and documents into ``dimension``-d vectors."""
+
+    dimension: int
+
+    def embed_query(self, text: str) -> list[float]: ...
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]: ...
+
+
+class OpenAIEmbeddingProvider:
+    """Remote embeddings through the OpenAI API.
+
+    text-embedding-3 models are asked for ``dimension``-d vectors; any model
+    returning a different size fails fast instead of reaching the vector column.
+    """
+
+    def __init__(self, model: str, dimension: int, api_key: str | None = None):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.model_name = model
+        self.dimension = dimension
+        # Only the text-embedding-3 family accepts a requested output size
+        dimensions = dimension if model.startswith("text-embedding-3") else None
+        self._model = OpenAIEmbeddings(model=model, dimensions=dimensions, openai_api_key=api_key)
+
+    def _check(self, vectors: list[list[float]]) -> list[list[float]]:
+        for vector in vectors:
+            if len(vector) != self.dimension:
+                raise ValueError(
+                    f"Model {self.model_name} produces {len(vector)}-d vectors but "
+                    f"EMBEDDING_DIM is {self.dimension}"
+                )
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._check([self._model.embed_query(text)])[0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._check(self._model.embed_documents(texts))
+
+
+class LocalEmbeddingProvider:
+    """CPU sentence-transformers embeddings, loaded lazily once per process.
+
+    ``runtime="onnx"`` uses the ONNX Runtime backend (sentence-transformers
+    >= 3.2 with the ``onnx`` extra), which is noticeably faster on CPU.
+    Inference is thread-safe; the lock only guards the one-time model load.
+    """
+
+    def __init__(self, model: str, dimension: int, runtime: str = "torch", device: str = "cpu"):
+        self.model_name = model
+        self.dimension = dimension
+        self.runtime = runtime
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=local requires sentence-transformers. "
+                "Install with: pip install -e '.[local]'"
+            ) from e
+
+        kwargs = {"device": self.device}
+        if self.runtime == "onnx":
+            kwargs["backend"] = "onnx"
+        model = SentenceTransformer(self.model_name, **kwargs)
+
+        actual = model.get_sentence_embedding_dimension()
+        if actual != self.dimension:
+            raise ValueError(
+                f"Model {self.model_name} produces {actual}-d vectors but "
+                f"EMBEDDING_DIM is {self.dimension}"
+            )
+        return model
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self._get_model().encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.tolist()
+
+
+def create_embedding_provider(
+    backend: str,
+    model: str,
+    dimension: int,
+    openai_api_key: str | None = None,
+    runtime: str = "torch",
+    device: str = "cpu",
+) -> EmbeddingProvider:
+    """Build an embedding provider for the given backend name."""
+    if backend == "openai":
+        return OpenAIEmbeddingProvider(model, dimension, api_key=openai_api_key)
+    if backend == "local":
+        return LocalEmbeddingProvider(model, dimension, runtime=runtime, device=device)
+    raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'openai' or 'local')")
 
 
 @lru_cache(maxsize=1)
-def get_embedding_model() -> OpenAIEmbeddings:
-    """Load and cache the OpenAI embedding model."""
-    return OpenAIEmbeddings(
+def get_embedding_provider() -> EmbeddingProvider:
+    """Load and cache the configured embedding provider."""
+    return create_embedding_provider(
+        backend=settings.embedding_backend,
         model=settings.embedding_model,
+        dimension=settings.embedding_dim,
         openai_api_key=settings.openai_api_key,
+        runtime=settings.embedding_runtime,
+        device=settings.embedding_device,
     )
 
 
-def embed_query(query: str) -> list[float]:
-    """Embed a single query string."""
-    model = get_embedding_model()
-    return model.embed_query(query)
+@lru_cache(maxsize=1)
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Start and cache the micro-batching dispatcher for query embeddings."""
+    return EmbeddingBatcher(
+        get_embedding_provider(),
+        max_batch_size=settings.embedding_batch_max_size,
+        max_wait_ms=settings.embedding_batch_max_wait_ms,
+        workers=settings.embedding_batch_workers,
+    )
+
+
+def embedding_batcher_stats() -> dict | None:
+    """Batching metrics, or ``None`` if the batcher has not been started."""
+    if not get_embedding_batcher.cache_info().currsize:
+        return None
+    return get_embedding_batcher().stats()
+
+
+def shutdown_embedding_batcher() -> None:
+    """Stop the batcher's worker threads (if started) so a new one can start later."""
+    if get_embedding_batcher.cache_info().currsize:
+        get_embedding_batcher().close()
+        get_embedding_batcher.cache_clear()
+
+
+def normalize_query(query: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive cache key for a query."""
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of query vectors keyed on ``normalize_query``."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def put(self, key: str, vector: list[float]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+query_embedding_cache = QueryEmbeddingCache(settings.query_embedding_cache_size)
+
+
+@lru_cache(maxsize=1)
+def _direct_pool() -> ThreadPoolExecutor:
+    """Threads for unbatched embedding calls that run under a deadline."""
+    return ThreadPoolExecutor(
+        max_workers=settings.embedding_batch_workers, thread_name_prefix="embedding"
+    )
+
+
+def _remember(key: str, future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        query_embedding_cache.put(key, future.result())
+
+
+@timed("embed")
+def embed_query(query: str, timeout: float | None = None) -> list[float]:
+    """Embed a single query string.
+
+    Vectors are cached per normalized query, so repeated or near-identical
+    queries ("Rural medicine?" / "rural medicine") skip the provider. When
+    ``EMBEDDING_BATCH_ENABLED`` is set, concurrent calls are batched together
+    by ``get_embedding_batcher()``.
+
+    With ``timeout`` (seconds), raises ``TimeoutError`` if the vector is not
+    ready in time. The call keeps running and its result is still cached, so a
+    retry of the same query after a stall is served from the cache.
+    """
+    key = normalize_query(query)
+    cached = query_embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if settings.embedding_batch_enabled:
+        future = get_embedding_batcher().submit(query)
+    elif timeout is None:
+        vector = get_embedding_provider().embed_query(query)
+        query_embedding_cache.put(key, vector)
+        return vector
+    else:
+        future = _direct_pool().submit(get_embedding_provider().embed_query, query)
+
+    future.add_done_callback(partial(_remember, key))
+    return future.result(timeout=timeout)
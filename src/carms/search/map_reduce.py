@@ -0,0 +1,173 @@
+"""Map-reduce RAG for questions that span many programs.
+
+"Compare interview formats across psychiatry programs" needs evidence from
+every matching program, more than one stuffed prompt holds. This mode:
+
+1. selects programs with the same filters as the agent's ``filter_programs``
+   tool (explicit ids, or discipline/school names found in the question),
+   ranked by relevance with one grouped ``SearchService`` query that also
+   returns each program's best chunks;
+2. maps: asks the LLM about each program's chunks concurrently, at most
+   ``RAG_MAP_CONCURRENCY`` calls at a time;
+3. reduces: combines the per-program notes into one answer.
+
+Latency is roughly one retrieval + the slowest map call + the reduce call,
+instead of the sum over programs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import PromptTemplate
+from sqlalchemy import text
+from sqlmodel import Session
+
+from carms.config import settings
+from carms.db.engine import engine
+from carms.search.rag import get_llm, message_text
+from carms.search.retriever import SearchResult, SearchService
+from carms.timing import span
+
+NOT_RELEVANT = "NOT RELEVANT"
+
+MAP_PROMPT = PromptTemplate(
+    input_variables=["program", "context", "question"],
+    template="""You are reviewing one Canadian residency program (CaRMS): {program}.
+Using only the excerpts below, write brief notes that help answer the question.
+If the excerpts say nothing relevant, reply exactly "NOT RELEVANT".
+
+Excerpts:
+{context}
+
+Question: {question}
+
+Notes:""",
+)
+
+REDUCE_PROMPT = PromptTemplate(
+    input_variables=["notes", "question"],
+    template="""You are an expert advisor on Canadian medical residency programs (CaRMS).
+Below are notes gathered separately for each program. Combine them into one answer
+to the question, naming programs explicitly. Do not add facts that are not in the notes.
+
+{notes}
+
+Question: {question}
+
+Answer:""",
+)
+
+
+def infer_filters(session: Session, question: str) -> dict:
+    """Discipline and school ids whose names appear in ``question``.
+
+    Longest names win, so "Family Medicine" is preferred over "Medicine".
+    """
+    lowered = question.lower()
+    filters = {}
+    for key, table in (("discipline_id", "disciplines"), ("school_id", "schools")):
+        rows = session.execute(
+            text(f"SELECT id, name FROM {table} ORDER BY LENGTH(name) DESC")
+        ).fetchall()
+        for row_id, name in rows:
+            if re.search(rf"\b{re.escape(name.lower())}\b", lowered):
+                filters[key] = row_id
+                break
+    return filters
+
+
+def select_programs(
+    question: str,
+    discipline_id: int | None = None,
+    school_id: int | None = None,
+    site: str | None = None,
+    stream: str | None = None,
+    max_programs: int | None = None,
+    chunks_per_program: int = 3,
+) -> list[SearchResult]:
+    """Programs to map over, each with its best ``chunks_per_program`` snippets."""
+    with Session(engine) as session:
+        filters = {"discipline_id": discipline_id, "school_id": school_id}
+        if not any(filters.values()) and site is None and stream is None:
+            filters.update(infer_filters(session, question))
+        return SearchService(session).search(
+            query=question,
+            top_k=max_programs or settings.rag_map_max_programs,
+            site=site,
+            stream=stream,
+            group_by="program",
+            chunks_per_program=chunks_per_program,
+            **filters,
+        )
+
+
+def _program_label(result: SearchResult) -> str:
+    return f"{result.program_name} ({result.school}, {result.site}, {result.stream})"
+
+
+async def amap_reduce_ask(
+    question: str,
+    discipline_id: int | None = None,
+    school_id: int | None = None,
+    site: str | None = None,
+    stream: str | None = None,
+    max_programs: int | None = None,
+    llm: BaseChatModel | None = None,
+) -> dict:
+    """Answer ``question`` by summarizing each matching program in parallel.
+
+    ``llm`` defaults to the shared RAG model; pass a stub in tests.
+    """
+    llm = llm or get_llm()
+    programs = await asyncio.to_thread(
+        select_programs, question, discipline_id, school_id, site, stream, max_programs
+    )
+    if not programs:
+        return {"answer": "No matching programs were found.", "sources": [], "programs": 0}
+
+    semaphore = asyncio.Semaphore(settings.rag_map_concurrency)
+
+    async def summarize(result: SearchResult) -> str:
+        prompt = MAP_PROMPT.format(
+            program=_program_label(result),
+            context="\n\n".join(result.snippets or [result.chunk_text]),
+            question=question,
+        )
+        async with semaphore:
+            return message_text(await llm.ainvoke(prompt)).strip()
+
+    with span("rag.map"):
+        notes = await asyncio.gather(*(summarize(result) for result in programs))
+
+    relevant = [
+        (result, note)
+        for result, note in zip(programs, notes)
+        if note and not note.upper().startswith(NOT_RELEVANT)
+    ]
+    if not relevant:
+        answer = "None of the matching programs' descriptions address this question."
+    else:
+        combined = "\n\n".join(f"### {_program_label(r)}\n{note}" for r, note in relevant)
+        with span("rag.reduce"):
+            answer = message_text(
+                await llm.ainvoke(REDUCE_PROMPT.format(notes=combined, question=question))
+            )
+
+    return {
+        "answer": answer,
+        "sources": [
+            {
+                "program_name": r.program_name,
+                "discipline": r.discipline,
+                "school": r.school,
+                "site": r.site,
+                "similarity": r.similarity,
+                "excerpt": r.chunk_text[:200],
+            }
+            for r, _ in relevant
+        ],
+        "programs": len(programs),
+    }
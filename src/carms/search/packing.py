@@ -0,0 +1,153 @@
+"""Token-budgeted context packing for RAG prompts.
+
+Retrieved chunks are packed before they are "stuffed" into the prompt:
+
+1. Chunks of the same program that the splitter cut with an overlap
+   (``CHUNK_OVERLAP``) are stitched back into one passage.
+2. Near-duplicate passages (e.g. boilerplate shared by CMG/IMG twin programs)
+   are dropped; the kept passage lists the other programs it applies to.
+3. Passages are added in similarity order until ``RAG_CONTEXT_TOKEN_BUDGET``
+   is reached.
+
+Token counts are estimated from character length, which is close enough for
+budgeting English prose without loading a tokenizer.
+"""
+
+import logging
+import re
+
+from langchain_core.documents import Document
+
+from carms.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+MIN_OVERLAP = 16
+SHINGLE_SIZE = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text``."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    for size in range(min(len(left), len(right), max_overlap), MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _similarity(doc: Document) -> float:
+    return doc.metadata.get("similarity") or 0.0
+
+
+def merge_adjacent(docs: list[Document], max_overlap: int | None = None) -> list[Document]:
+    """Stitch overlapping chunks of the same program into single passages.
+
+    Also drops a chunk wholly contained in another chunk of the same program.
+    The merged passage keeps the best similarity and the earliest position.
+    """
+    max_overlap = max_overlap or 2 * settings.chunk_overlap
+    merged: list[Document] = []
+    for doc in docs:
+        program_id = doc.metadata.get("program_id")
+        text = doc.page_content
+        for i, kept in enumerate(merged):
+            if kept.metadata.get("program_id") != program_id:
+                continue
+            if text in kept.page_content:
+                break
+            if kept.page_content in text:
+                combined = text
+            elif size := _overlap(kept.page_content, text, max_overlap):
+                combined = kept.page_content + text[size:]
+            elif size := _overlap(text, kept.page_content, max_overlap):
+                combined = text + kept.page_content[size:]
+            else:
+                continue
+            metadata = {**kept.metadata, "similarity": max(_similarity(kept), _similarity(doc))}
+            merged[i] = Document(page_content=combined, metadata=metadata)
+            break
+        else:
+            merged.append(doc)
+
+    # A stitched passage may now overlap another chunk of the same program
+    return merge_adjacent(merged, max_overlap) if len(merged) < len(docs) else merged
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def remove_near_duplicates(docs: list[Document], threshold: float | None = None) -> list[Document]:
+    """Drop passages whose word-shingle Jaccard similarity to a kept one is >= ``threshold``.
+
+    ``docs`` should be in priority order; the earlier passage is kept and
+    records the dropped passage's program under ``also_programs``.
+    """
+    threshold = settings.rag_dedup_threshold if threshold is None else threshold
+    kept: list[tuple[Document, set]] = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        for other, other_shingles in kept:
+            union = len(shingles | other_shingles)
+            if union and len(shingles & other_shingles) / union >= threshold:
+                name = doc.metadata.get("program_name")
+                also = other.metadata.setdefault("also_programs", [])
+                if name and name != other.metadata.get("program_name") and name not in also:
+                    also.append(name)
+                break
+        else:
+            kept.append((doc, shingles))
+    return [doc for doc, _ in kept]
+
+
+def format_passage(doc: Document) -> str:
+    """Passage with a one-line program header for attribution in the prompt."""
+    header = doc.metadata.get("program_name")
+    if header is None:
+        return doc.page_content
+    if school := doc.metadata.get("school"):
+        header += f" | {school}"
+    if also := doc.metadata.get("also_programs"):
+        header += f" (also: {', '.join(also)})"
+    return f"[{header}]\n{doc.page_content}"
+
+
+def pack_documents(docs: list[Document], token_budget: int | None = None) -> list[Document]:
+    """Merge, de-duplicate and fill ``token_budget`` in similarity order."""
+    token_budget = token_budget or settings.rag_context_token_budget
+    ordered = sorted(
+        (Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in docs),
+        key=_similarity,
+        reverse=True,
+    )
+    passages = remove_near_duplicates(merge_adjacent(ordered))
+
+    packed: list[Document] = []
+    used = 0
+    for doc in passages:
+        cost = estimate_tokens(format_passage(doc))
+        if used + cost <= token_budget:
+            packed.append(doc)
+            used += cost
+        elif not packed:
+            # Always include something: truncate the best passage to the budget
+            doc.page_content = doc.page_content[: token_budget * CHARS_PER_TOKEN]
+            packed.append(doc)
+            used = token_budget
+
+    logger.debug(
+        "Packed %d chunks (~%d tokens) into %d passages (~%d tokens)",
+        len(docs),
+        sum(estimate_tokens(d.page_content) for d in docs),
+        len(packed),
+        used,
+    )
+    return packed
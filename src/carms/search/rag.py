@@ -1,19 +1,42 @@
-"""LangChain RAG pipeline wrapping the existing CaRMS search service."""
+"""LangChain RAG pipeline wrapping the existing CaRMS search service.
+
+The LLM client is built once per process and reused. ``ask`` is the blocking
+path; ``astream_answer`` retrieves in a worker thread and streams generated
+tokens as they arrive, so the first token is available roughly one retrieval
+after the request instead of after the whole generation. Both retrieve, fill
+``CARMS_RAG_PROMPT`` themselves and consult ``answer_cache`` before calling
+the LLM.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+from collections.abc import AsyncIterator
+from functools import lru_cache
 from typing import Any
 
 from langchain_anthropic import ChatAnthropic
-from langchain_classic.chains import RetrievalQA
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
 from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import PromptTemplate
 from langchain_core.retrievers import BaseRetriever
 from pydantic import Field
 from sqlmodel import Session
 
+from carms.config import settings
 from carms.db.engine import engine
+from carms.search.answer_cache import BYPASS, answer_cache, answer_cache_key, dataset_version
+from carms.search.packing import format_passage, pack_documents
 from carms.search.retriever import SearchService
+from carms.singleflight import get_flight
+from carms.timing import span, timed
+
+RAG_MODEL = "claude-haiku-4-5-20251001"
 
 CARMS_RAG_PROMPT = PromptTemplate(
     input_variables=["context", "question"],
@@ -29,71 +52,170 @@ Question: {question}
 Answer:""",
 )
 
+# Identifies what produces an answer, so cached answers expire with a model or prompt change
+GENERATOR_ID = f"{RAG_MODEL}:{hashlib.sha1(CARMS_RAG_PROMPT.template.encode()).hexdigest()[:12]}"
+
+
+def retrieve_documents(query: str, top_k: int) -> list[Document]:
+    """Top-k program chunks for ``query`` as LangChain documents."""
+    with Session(engine) as session:
+        service = SearchService(session)
+        results = service.search(query=query, top_k=top_k)
+
+    return [
+        Document(
+            page_content=r.chunk_text,
+            metadata={
+                "program_id": r.program_id,
+                "program_name": r.program_name,
+                "discipline": r.discipline,
+                "school": r.school,
+                "site": r.site,
+                "similarity": r.similarity,
+            },
+        )
+        for r in results
+    ]
+
 
 class CaRMSRetriever(BaseRetriever):
     """Custom LangChain retriever wrapping the existing SearchService.
 
     Delegates to ``SearchService.search()`` so we reuse the pgvector
-    infrastructure without data duplication.
+    infrastructure without data duplication. The async variant runs the
+    blocking search in a worker thread.
+
+    With ``pack`` (default) the top-k chunks are merged, de-duplicated and
+    trimmed to ``token_budget`` by ``pack_documents``. Each document's
+    ``passage`` metadata is the text that goes into the prompt.
     """
 
     top_k: int = Field(default=8)
+    pack: bool = Field(default=True)
+    token_budget: int | None = Field(default=None)
+
+    @timed("rag.retrieve")
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        docs = retrieve_documents(query, self.top_k)
+        if self.pack:
+            docs = pack_documents(docs, self.token_budget)
+        for doc in docs:
+            doc.metadata["passage"] = format_passage(doc)
+        return docs
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return await asyncio.to_thread(
+            self._get_relevant_documents, query, run_manager=run_manager.get_sync()
+        )
+
+
+@lru_cache(maxsize=1)
+def get_llm() -> BaseChatModel:
+    """The shared chat model; its HTTP client and connection pool are reused."""
+    return ChatAnthropic(model=RAG_MODEL, max_tokens=1024)
+
+
+def format_source(doc: Document) -> dict:
+    """Source citation for a retrieved chunk."""
+    return {
+        "program_name": doc.metadata.get("program_name"),
+        "discipline": doc.metadata.get("discipline"),
+        "school": doc.metadata.get("school"),
+        "site": doc.metadata.get("site"),
+        "similarity": doc.metadata.get("similarity"),
+        "excerpt": doc.page_content[:200],
+    }
+
+
+def format_context(docs: list[Document]) -> str:
+    """Packed passages (program header + text), separated by blank lines."""
+    return "\n\n".join(doc.metadata.get("passage", doc.page_content) for doc in docs)
 
-    def _get_relevant_documents(self, query: str, **kwargs: Any) -> list[Document]:
-        with Session(engine) as session:
-            service = SearchService(session)
-            results = service.search(query=query, top_k=self.top_k)
-
-        return [
-            Document(
-                page_content=r.chunk_text,
-                metadata={
-                    "program_id": r.program_id,
-                    "program_name": r.program_name,
-                    "discipline": r.discipline,
-                    "school": r.school,
-                    "site": r.site,
-                    "similarity": r.similarity,
-                },
-            )
-            for r in results
-        ]
-
-
-def create_rag_chain(k: int = 8) -> RetrievalQA:
-    """Build a RetrievalQA chain using CaRMS data and Claude as the LLM."""
-    retriever = CaRMSRetriever(top_k=k)
-    llm = ChatAnthropic(model="claude-haiku-4-5-20251001", max_tokens=1024)
-
-    chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",
-        retriever=retriever,
-        return_source_documents=True,
-        chain_type_kwargs={"prompt": CARMS_RAG_PROMPT},
-    )
-    return chain
+
+def build_prompt(question: str, docs: list[Document]) -> str:
+    return CARMS_RAG_PROMPT.format(context=format_context(docs), question=question)
+
+
+def lookup_answer(
+    question: str, k: int, docs: list[Document]
+) -> tuple[str | None, str | None, str]:
+    """Check the answer cache for ``docs``; returns ``(key, answer, status)``."""
+    if not settings.rag_cache_enabled or not docs:
+        return None, None, BYPASS
+    with Session(engine) as session:
+        version = dataset_version(session)
+    evidence = [
+        (doc.metadata.get("program_id"), doc.metadata.get("passage", doc.page_content))
+        for doc in docs
+    ]
+    key = answer_cache_key(question, k, evidence, version, GENERATOR_ID)
+    answer, status = answer_cache.get(key)
+    return key, answer, status
 
 
 def ask(question: str, k: int = 8) -> dict:
-    """High-level helper: ask a question and get answer + sources."""
-    chain = create_rag_chain(k=k)
-    result = chain.invoke({"query": question})
-
-    sources = []
-    for doc in result.get("source_documents", []):
-        sources.append(
-            {
-                "program_name": doc.metadata.get("program_name"),
-                "discipline": doc.metadata.get("discipline"),
-                "school": doc.metadata.get("school"),
-                "site": doc.metadata.get("site"),
-                "similarity": doc.metadata.get("similarity"),
-                "excerpt": doc.page_content[:200],
-            }
-        )
+    """High-level helper: ask a question and get answer + sources.
+
+    Identical questions asked concurrently share one invocation. ``cache`` is
+    ``hit``, ``hit_persistent``, ``miss`` or ``bypass``.
+    """
+    return get_flight("rag").do((question.strip(), k), lambda: _ask(question, k))
+
+
+def _ask(question: str, k: int) -> dict:
+    docs = CaRMSRetriever(top_k=k).invoke(question)
+    key, answer, status = lookup_answer(question, k, docs)
+    if answer is None:
+        with span("rag.generate"):
+            answer = message_text(get_llm().invoke(build_prompt(question, docs)))
+        if key is not None and answer:
+            answer_cache.put(key, question, answer)
 
     return {
-        "answer": result["result"],
-        "sources": sources,
+        "answer": answer,
+        "sources": [format_source(doc) for doc in docs],
+        "cache": status,
     }
+
+
+def message_text(chunk: Any) -> str:
+    """Text of a chat model message or stream chunk."""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    # Content blocks (e.g. Anthropic): keep only the text deltas
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+async def astream_answer(question: str, k: int = 8) -> AsyncIterator[tuple[str, Any]]:
+    """Retrieve, then stream the answer.
+
+    Yields ``("sources", [...])`` once retrieval finishes, then
+    ``("token", text)`` for each generated chunk (a single one on a cache
+    hit), then ``("done", {"answer": ..., "cache": status})``.
+    """
+    docs = await CaRMSRetriever(top_k=k).ainvoke(question)
+    yield "sources", [format_source(doc) for doc in docs]
+
+    key, answer, status = await asyncio.to_thread(lookup_answer, question, k, docs)
+    if answer is not None:
+        yield "token", answer
+        yield "done", {"answer": answer, "cache": status}
+        return
+
+    parts: list[str] = []
+    with span("rag.generate"):
+        async for chunk in get_llm().astream(build_prompt(question, docs)):
+            text = message_text(chunk)
+            if text:
+                parts.append(text)
+                yield "token", text
+
+    answer = "".join(parts)
+    if key is not None and answer:
+        await asyncio.to_thread(answer_cache.put, key, question, answer)
+    yield "done", {"answer": answer, "cache": status}
@@ -1,11 +1,64 @@
 """Search service - semantic search via pgvector with filtering."""
 
+import logging
 from dataclasses import dataclass
 
 from sqlalchemy import text
 from sqlmodel import Session
 
+from carms.config import settings
 from carms.search.embeddings import embed_query
+from carms.search.vector_index import shortlist_distance
+from carms.singleflight import get_flight
+from carms.timing import span, timed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EF_SEARCH = 40
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+RRF_K = 60
+
+# pgvector >= 0.8 supports hnsw.iterative_scan; cached per process
+_iterative_scan_supported: bool | None = None
+
+
+FACET_FIELDS = ("discipline", "school", "site", "stream")
+
+
+def _facet_json(field: str, column: str) -> str:
+    return f"""
+                        '{field}', (
+                            SELECT COALESCE(
+                                json_agg(
+                                    json_build_object('value', value, 'count', n)
+                                    ORDER BY n DESC, value
+                                ),
+                                '[]'::json
+                            )
+                            FROM (
+                                SELECT {column} AS value, COUNT(*) AS n
+                                FROM facet_programs fp
+                                GROUP BY {column}
+                            ) counts
+                        )"""
+
+
+_FACET_PAIRS = ",".join(_facet_json(field, f"fp.{field}") for field in FACET_FIELDS)
+
+# Distinct programs among the candidates, with counts per facet as one JSON value.
+# Only the (bounded) candidate set is joined to the dimension tables.
+FACETS_CTE = f"""
+                facet_programs AS (
+                    SELECT p.site, p.stream, d.name AS discipline, s.name AS school
+                    FROM (SELECT DISTINCT program_id FROM candidates) cp
+                    JOIN programs p ON cp.program_id = p.id
+                    JOIN disciplines d ON p.discipline_id = d.id
+                    JOIN schools s ON p.school_id = s.id
+                ),
+                facets AS (
+                    SELECT json_build_object({_FACET_PAIRS}
+                    ) AS facets
+                )"""
 
 
 @dataclass
@@ -19,14 +72,217 @@ class SearchResult:
     chunk_text: str
     similarity: float
     url: str | None = None
+    snippets: list[str] | None = None
+
+
+@dataclass
+class SearchPlan:
+    """How a search was executed, reported in debug output."""
+
+    strategy: str  # "hnsw", "exact", "hnsw_iterative", "hnsw_wide_ef" or "lexical"
+    mode: str = "vector"
+    index_mode: str | None = None
+    filtered_rows: int | None = None
+    ef_search: int | None = None
+    fallback: str | None = None
+    degraded: str | None = None  # "embedding_timeout" or "embedding_error"
+
+
+def normalize_site(site: str) -> str:
+    """Normalize a site name the same way ``program_embeddings.site_normalized`` is stored."""
+    return site.strip().lower()
+
+
+def build_filters(
+    discipline_id: int | None = None,
+    school_id: int | None = None,
+    site: str | None = None,
+    stream: str | None = None,
+    alias: str = "pe",
+) -> tuple[list[str], dict]:
+    """Build WHERE conditions on the denormalized ``program_embeddings`` columns.
+
+    ``stream`` is matched against the CMG/IMG flags (e.g. ``"CMG"``, ``"img"``).
+    """
+    conditions = []
+    params: dict = {}
+
+    if discipline_id is not None:
+        conditions.append(f"{alias}.discipline_id = :discipline_id")
+        params["discipline_id"] = discipline_id
+    if school_id is not None:
+        conditions.append(f"{alias}.school_id = :school_id")
+        params["school_id"] = school_id
+    if site is not None:
+        conditions.append(f"{alias}.site_normalized LIKE :site")
+        params["site"] = f"%{normalize_site(site)}%"
+    if stream is not None:
+        normalized = stream.strip().lower()
+        if "cmg" in normalized:
+            conditions.append(f"{alias}.is_cmg")
+        if "img" in normalized:
+            conditions.append(f"{alias}.is_img")
+
+    return conditions, params
 
 
 class SearchService:
     """Semantic search over program embeddings."""
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, index_mode: str | None = None):
         self.session = session
+        self.index_mode = index_mode or settings.vector_index_mode
+        self.last_plan: SearchPlan | None = None
+        self.last_facets: dict | None = None
+
+    def _supports_iterative_scan(self) -> bool:
+        global _iterative_scan_supported
+        if _iterative_scan_supported is None:
+            version = self.session.execute(
+                text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            ).scalar()
+            parts = tuple(int(x) for x in (version or "0").split(".")[:2] if x.isdigit())
+            _iterative_scan_supported = parts >= (0, 8)
+        return _iterative_scan_supported
+
+    def _set_ef_search(self, ef_search: int) -> None:
+        self.session.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(ef_search)}
+        )
+
+    def _plan(self, conditions: list[str], params: dict, limit: int) -> SearchPlan:
+        """Pick a scan strategy for the given filters and candidate ``limit``.
+
+        HNSW returns only ``ef_search`` candidates before filtering, so selective
+        filters can leave far fewer than ``limit`` rows. Small filtered subsets
+        are scanned exactly; larger ones use iterative index scans (pgvector
+        >= 0.8) or a widened ``ef_search``. Settings are transaction-local.
+        """
+        if not conditions:
+            if limit <= DEFAULT_EF_SEARCH:
+                return SearchPlan(strategy="hnsw")
+            ef_search = min(limit, settings.search_max_ef_search)
+            self._set_ef_search(ef_search)
+            return SearchPlan(strategy="hnsw", ef_search=ef_search)
+
+        threshold = settings.search_exact_scan_threshold
+        with span("plan"):
+            filtered_rows = self.session.execute(
+                text(f"""
+                    SELECT COUNT(*) FROM (
+                        SELECT 1 FROM program_embeddings pe
+                        WHERE {" AND ".join(conditions)}
+                        LIMIT :threshold
+                    ) sub
+                """),
+                {**params, "threshold": threshold + 1},
+            ).scalar_one()
+
+        if filtered_rows <= threshold:
+            return SearchPlan(strategy="exact", filtered_rows=filtered_rows)
+
+        if self._supports_iterative_scan():
+            ef_search = min(max(DEFAULT_EF_SEARCH, 2 * limit), settings.search_max_ef_search)
+            self.session.execute(
+                text("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+            )
+            strategy = "hnsw_iterative"
+        else:
+            ef_search = settings.search_max_ef_search
+            strategy = "hnsw_wide_ef"
+        self._set_ef_search(ef_search)
+        return SearchPlan(strategy=strategy, filtered_rows=filtered_rows, ef_search=ef_search)
+
+    def _vector_cte(self, where: str, plan: SearchPlan) -> str:
+        """CTE ``vec`` with the nearest chunks, best first, as (score, rank)."""
+        if plan.strategy == "exact":
+            # MATERIALIZED keeps the planner from using the HNSW index, giving an
+            # exact scan over the (small) filtered subset
+            return f"""
+                filtered AS MATERIALIZED (
+                    SELECT pe.id, pe.program_id, pe.chunk_text, pe.embedding
+                    FROM program_embeddings pe
+                    {where}
+                ),
+                vec AS (
+                    SELECT *, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+                    FROM (
+                        SELECT
+                            f.id,
+                            f.program_id,
+                            f.chunk_text,
+                            1 - (f.embedding <=> CAST(:embedding AS vector)) AS score
+                        FROM filtered f
+                        ORDER BY f.embedding <=> CAST(:embedding AS vector)
+                        LIMIT :retriever_k
+                    ) nearest
+                )"""
+        shortlist = shortlist_distance(
+            self.index_mode, settings.embedding_dim, settings.vector_index_dim
+        )
+        if shortlist is not None:
+            # Shortlist on the compact index, then re-rank on full-precision vectors
+            return f"""
+                vec AS (
+                    SELECT *, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+                    FROM (
+                        SELECT
+                            sl.id,
+                            sl.program_id,
+                            sl.chunk_text,
+                            1 - (sl.embedding <=> CAST(:embedding AS vector)) AS score
+                        FROM (
+                            SELECT pe.id, pe.program_id, pe.chunk_text, pe.embedding
+                            FROM program_embeddings pe
+                            {where}
+                            ORDER BY {shortlist}
+                            LIMIT :shortlist_k
+                        ) sl
+                        ORDER BY sl.embedding <=> CAST(:embedding AS vector)
+                        LIMIT :retriever_k
+                    ) nearest
+                )"""
+        return f"""
+                vec AS (
+                    SELECT *, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+                    FROM (
+                        SELECT
+                            pe.id,
+                            pe.program_id,
+                            pe.chunk_text,
+                            1 - (pe.embedding <=> CAST(:embedding AS vector)) AS score
+                        FROM program_embeddings pe
+                        {where}
+                        ORDER BY pe.embedding <=> CAST(:embedding AS vector)
+                        LIMIT :retriever_k
+                    ) nearest
+                )"""
 
+    @staticmethod
+    def _lexical_cte(conditions: list[str]) -> str:
+        """CTE ``lex`` with full-text matches on ``chunk_tsv`` (GIN-indexed)."""
+        where = " AND ".join(
+            ["pe.chunk_tsv @@ websearch_to_tsquery('english', :query)", *conditions]
+        )
+        return f"""
+                lex AS (
+                    SELECT *, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+                    FROM (
+                        SELECT
+                            pe.id,
+                            pe.program_id,
+                            pe.chunk_text,
+                            ts_rank_cd(
+                                pe.chunk_tsv, websearch_to_tsquery('english', :query)
+                            ) AS score
+                        FROM program_embeddings pe
+                        WHERE {where}
+                        ORDER BY score DESC
+                        LIMIT :retriever_k
+                    ) matches
+                )"""
+
+    @timed("search")
     def search(
         self,
         query: str,
@@ -34,29 +290,209 @@ class SearchService:
         discipline_id: int | None = None,
         school_id: int | None = None,
         site: str | None = None,
+        stream: str | None = None,
+        group_by: str | None = None,
+        chunks_per_program: int = 1,
+        mode: str = "vector",
+        facets: bool = False,
+    ) -> list[SearchResult]:
+        """Find program chunks matching ``query``.
+
+        ``mode`` selects the retriever: ``"vector"`` (embedding similarity),
+        ``"lexical"`` (Postgres full-text search, no embedding call) or
+        ``"hybrid"`` (both, merged with reciprocal-rank fusion). ``similarity``
+        holds the cosine similarity, ``ts_rank_cd`` or fused RRF score
+        respectively. If the embedding call fails or misses the
+        ``SEARCH_EMBEDDING_TIMEOUT_MS`` budget, search falls back to lexical and
+        ``last_plan.degraded`` says why.
+
+        Filtering and ranking run on ``program_embeddings`` alone; program,
+        discipline and school names are joined only for the final ``top_k``
+        rows. The chosen strategy is kept on ``last_plan``.
+
+        With ``group_by="program"`` candidates are over-fetched and reduced in
+        SQL to the best ``chunks_per_program`` chunks per program, returning
+        ``top_k`` distinct programs. ``chunk_text`` is the best chunk and
+        ``snippets`` holds all kept chunks, best first.
+
+        With ``facets=True`` the candidate set is widened to
+        ``SEARCH_FACET_DEPTH`` chunks and program counts per discipline, school,
+        site and stream over those candidates are computed in the same query;
+        they are kept on ``last_facets``.
+
+        Identical concurrent searches share one execution (see
+        ``carms.singleflight``); the returned list is shared and read-only.
+        """
+        args = (
+            query,
+            top_k,
+            discipline_id,
+            school_id,
+            site,
+            stream,
+            group_by,
+            chunks_per_program,
+            mode,
+            facets,
+        )
+
+        def run() -> tuple[list[SearchResult], SearchPlan | None, dict | None]:
+            results = self._search(*args)
+            return results, self.last_plan, self.last_facets
+
+        results, self.last_plan, self.last_facets = get_flight("search").do(
+            (*args, self.index_mode), run
+        )
+        return results
+
+    def _search(
+        self,
+        query: str,
+        top_k: int,
+        discipline_id: int | None,
+        school_id: int | None,
+        site: str | None,
+        stream: str | None,
+        group_by: str | None,
+        chunks_per_program: int,
+        mode: str,
+        facets: bool,
     ) -> list[SearchResult]:
-        """Embed query and find similar program chunks."""
-        vector = embed_query(query)
-
-        # Build WHERE clause
-        conditions = []
-        params: dict = {"embedding": str(vector), "top_k": top_k}
-
-        if discipline_id is not None:
-            conditions.append("p.discipline_id = :discipline_id")
-            params["discipline_id"] = discipline_id
-        if school_id is not None:
-            conditions.append("p.school_id = :school_id")
-            params["school_id"] = school_id
-        if site is not None:
-            conditions.append("LOWER(p.site) LIKE LOWER(:site)")
-            params["site"] = f"%{site}%"
+        if group_by not in (None, "program"):
+            raise ValueError(f"Unsupported group_by: {group_by!r}")
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode!r}")
+
+        vector = None
+        fallback = degraded = None
+        if mode != "lexical":
+            timeout_ms = settings.search_embedding_timeout_ms
+            try:
+                vector = embed_query(query, timeout=timeout_ms / 1000 if timeout_ms else None)
+            except TimeoutError:
+                logger.warning(
+                    "Embedding missed its %.0f ms budget, falling back to lexical search",
+                    timeout_ms,
+                )
+                mode, fallback, degraded = "lexical", "lexical", "embedding_timeout"
+            except Exception as e:
+                logger.warning("Embedding failed, falling back to lexical search: %s", e)
+                mode, fallback, degraded = "lexical", "lexical", "embedding_error"
+
+        candidate_k = top_k
+        if group_by == "program":
+            candidate_k = min(
+                top_k * chunks_per_program * settings.search_group_overfetch,
+                settings.search_max_ef_search,
+            )
+        if facets:
+            candidate_k = max(candidate_k, settings.search_facet_depth)
+        retriever_k = candidate_k
+        if mode == "hybrid":
+            retriever_k = max(candidate_k, settings.search_rrf_depth)
+
+        shortlist_k = retriever_k
+        if self.index_mode != "full":
+            shortlist_k = min(
+                retriever_k * settings.vector_rerank_factor, settings.search_max_ef_search
+            )
+
+        conditions, params = build_filters(discipline_id, school_id, site, stream)
+        if mode == "lexical":
+            plan = SearchPlan(strategy="lexical")
+        else:
+            plan = self._plan(conditions, params, shortlist_k)
+            plan.index_mode = self.index_mode
+        plan.mode = mode
+        plan.fallback = fallback
+        plan.degraded = degraded
+        self.last_plan = plan
+        logger.debug("Search plan for %r: %s", query, plan)
+
+        params.update(
+            {
+                "query": query,
+                "top_k": top_k,
+                "candidate_k": candidate_k,
+                "retriever_k": retriever_k,
+                "shortlist_k": shortlist_k,
+                "per_program": chunks_per_program,
+                "rrf_k": RRF_K,
+            }
+        )
+        if vector is not None:
+            params["embedding"] = str(vector)
 
         where = ""
         if conditions:
             where = "WHERE " + " AND ".join(conditions)
 
+        if mode == "vector":
+            ctes = (
+                self._vector_cte(where, plan)
+                + """,
+                candidates AS (SELECT program_id, chunk_text, score FROM vec)"""
+            )
+        elif mode == "lexical":
+            ctes = (
+                self._lexical_cte(conditions)
+                + """,
+                candidates AS (SELECT program_id, chunk_text, score FROM lex)"""
+            )
+        else:
+            ctes = (
+                self._vector_cte(where, plan)
+                + ","
+                + self._lexical_cte(conditions)
+                + """,
+                candidates AS (
+                    SELECT
+                        COALESCE(v.program_id, l.program_id) AS program_id,
+                        COALESCE(v.chunk_text, l.chunk_text) AS chunk_text,
+                        COALESCE(1.0 / (:rrf_k + v.rank), 0)
+                            + COALESCE(1.0 / (:rrf_k + l.rank), 0) AS score
+                    FROM vec v
+                    FULL OUTER JOIN lex l ON v.id = l.id
+                    ORDER BY score DESC
+                    LIMIT :candidate_k
+                )"""
+            )
+
+        if group_by == "program":
+            ctes += """,
+                ranked AS (
+                    SELECT
+                        program_id,
+                        chunk_text,
+                        score,
+                        ROW_NUMBER() OVER (PARTITION BY program_id ORDER BY score DESC) AS rn
+                    FROM candidates
+                ),
+                results AS (
+                    SELECT
+                        program_id,
+                        MAX(score) AS score,
+                        ARRAY_AGG(chunk_text ORDER BY score DESC) AS snippets
+                    FROM ranked
+                    WHERE rn <= :per_program
+                    GROUP BY program_id
+                    ORDER BY MAX(score) DESC
+                    LIMIT :top_k
+                )"""
+            chunk_cols = "c.snippets[1] AS chunk_text, c.score AS similarity, p.url, c.snippets"
+        else:
+            ctes += """,
+                results AS (
+                    SELECT * FROM candidates ORDER BY score DESC LIMIT :top_k
+                )"""
+            chunk_cols = "c.chunk_text, c.score AS similarity, p.url, NULL AS snippets"
+
+        if facets:
+            ctes += "," + FACETS_CTE
+            chunk_cols += ", (SELECT facets FROM facets) AS facets"
+
         sql = text(f"""
+            WITH {ctes}
             SELECT
                 p.id AS program_id,
                 p.name AS program_name,
@@ -64,30 +500,32 @@ class SearchService:
                 s.name AS school,
                 p.site,
                 p.stream,
-                pe.chunk_text,
-                1 - (pe.embedding <=> CAST(:embedding AS vector)) AS similarity,
-                p.url
-            FROM program_embeddings pe
-            JOIN programs p ON pe.program_id = p.id
+                {chunk_cols}
+            FROM results c
+            JOIN programs p ON c.program_id = p.id
             JOIN disciplines d ON p.discipline_id = d.id
             JOIN schools s ON p.school_id = s.id
-            {where}
-            ORDER BY pe.embedding <=> CAST(:embedding AS vector)
-            LIMIT :top_k
+            ORDER BY c.score DESC
         """)
 
-        rows = self.session.execute(sql, params).fetchall()
-        return [
-            SearchResult(
-                program_id=row[0],
-                program_name=row[1],
-                discipline=row[2],
-                school=row[3],
-                site=row[4],
-                stream=row[5],
-                chunk_text=row[6],
-                similarity=float(row[7]),
-                url=row[8],
-            )
-            for row in rows
-        ]
+        with span("sql"):
+            rows = self.session.execute(sql, params).fetchall()
+        self.last_facets = None
+        if facets:
+            self.last_facets = rows[0][10] if rows else {field: [] for field in FACET_FIELDS}
+        with span("map"):
+            return [
+                SearchResult(
+                    program_id=row[0],
+                    program_name=row[1],
+                    discipline=row[2],
+                    school=row[3],
+                    site=row[4],
+                    stream=row[5],
+                    chunk_text=row[6],
+                    similarity=float(row[7]),
+                    url=row[8],
+                    snippets=list(row[9]) if row[9] is not None else None,
+                )
+                for row in rows
+            ]
@@ -0,0 +1,81 @@
+"""Program-to-program similarity over precomputed centroid vectors."""
+
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+
+@dataclass
+class SimilarProgram:
+    program_id: int
+    program_name: str
+    discipline: str
+    school: str
+    site: str
+    stream: str
+    similarity: float
+    url: str | None = None
+
+
+def find_similar_programs(
+    session: Session,
+    program_id: int,
+    k: int = 10,
+    same_discipline: bool = False,
+) -> list[SimilarProgram]:
+    """Nearest programs to ``program_id`` by centroid cosine similarity.
+
+    Uses ``program_centroids`` (built by the ``program_centroids`` asset), so no
+    embedding call is made. Returns an empty list if the program has no centroid.
+    """
+    discipline_filter = ""
+    if same_discipline:
+        discipline_filter = (
+            "AND pc.discipline_id = "
+            "(SELECT discipline_id FROM program_centroids WHERE program_id = :pid)"
+        )
+
+    # The scalar subquery is evaluated once, so the HNSW index can serve the ORDER BY
+    rows = session.execute(
+        text(f"""
+            WITH nearest AS (
+                SELECT
+                    pc.program_id,
+                    pc.centroid <=> (
+                        SELECT centroid FROM program_centroids WHERE program_id = :pid
+                    ) AS distance
+                FROM program_centroids pc
+                WHERE pc.program_id <> :pid
+                {discipline_filter}
+                ORDER BY pc.centroid <=> (
+                    SELECT centroid FROM program_centroids WHERE program_id = :pid
+                )
+                LIMIT :k
+            )
+            SELECT
+                p.id, p.name, d.name, s.name, p.site, p.stream,
+                1 - n.distance AS similarity, p.url
+            FROM nearest n
+            JOIN programs p ON n.program_id = p.id
+            JOIN disciplines d ON p.discipline_id = d.id
+            JOIN schools s ON p.school_id = s.id
+            WHERE n.distance IS NOT NULL
+            ORDER BY n.distance
+        """),
+        {"pid": program_id, "k": k},
+    ).fetchall()
+
+    return [
+        SimilarProgram(
+            program_id=row[0],
+            program_name=row[1],
+            discipline=row[2],
+            school=row[3],
+            site=row[4],
+            stream=row[5],
+            similarity=float(row[6]),
+            url=row[7],
+        )
+        for row in rows
+    ]
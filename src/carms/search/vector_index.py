@@ -0,0 +1,71 @@
+"""Compact HNSW index modes for ``program_embeddings.embedding``.
+
+The full-precision ``vector`` column is always stored, but the HNSW index can
+be built over a smaller expression so it stays cached in ``shared_buffers``:
+
+- ``full``: ``vector`` cosine index (default, 4 bytes/dim).
+- ``halfvec``: ``embedding::halfvec`` cosine index (2 bytes/dim).
+- ``binary``: ``binary_quantize(embedding)`` Hamming index (1 bit/dim).
+- ``truncated``: the first ``VECTOR_INDEX_DIM`` dims (Matryoshka embeddings
+  such as text-embedding-3 keep most of their quality when truncated).
+
+Compact modes shortlist ``VECTOR_RERANK_FACTOR`` × k candidates on the index,
+then re-rank them by exact cosine distance on the full vectors.
+"""
+
+INDEX_MODES = ("full", "halfvec", "binary", "truncated")
+INDEX_NAME = "ix_program_embeddings_hnsw"
+HNSW_WITH = "WITH (m = 16, ef_construction = 64)"
+
+
+def _check(mode: str, index_dim: int | None) -> None:
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown vector index mode: {mode!r} (expected one of {INDEX_MODES})")
+    if mode == "truncated" and not index_dim:
+        raise ValueError("VECTOR_INDEX_DIM is required for the 'truncated' index mode")
+
+
+def index_name(mode: str) -> str:
+    """Name of the HNSW index for ``mode``."""
+    return INDEX_NAME if mode == "full" else f"{INDEX_NAME}_{mode}"
+
+
+def index_ddl(mode: str, dim: int, index_dim: int | None = None) -> str:
+    """``CREATE INDEX`` statement for the HNSW index in ``mode``."""
+    _check(mode, index_dim)
+    if mode == "full":
+        expression = "embedding vector_cosine_ops"
+    elif mode == "halfvec":
+        expression = f"(embedding::halfvec({dim})) halfvec_cosine_ops"
+    elif mode == "binary":
+        expression = f"(binary_quantize(embedding)::bit({dim})) bit_hamming_ops"
+    else:
+        expression = (
+            f"(subvector(embedding, 1, {index_dim})::vector({index_dim})) vector_cosine_ops"
+        )
+    return (
+        f"CREATE INDEX IF NOT EXISTS {index_name(mode)} "
+        f"ON program_embeddings USING hnsw ({expression}) {HNSW_WITH}"
+    )
+
+
+def shortlist_distance(
+    mode: str, dim: int, index_dim: int | None = None, alias: str = "pe"
+) -> str | None:
+    """Distance expression that matches the compact index, or ``None`` for ``full``.
+
+    The expression must be textually identical to the index expression for
+    Postgres to use the index. The query vector is bound as ``:embedding``.
+    """
+    _check(mode, index_dim)
+    query = "CAST(:embedding AS vector)"
+    if mode == "full":
+        return None
+    if mode == "halfvec":
+        return f"{alias}.embedding::halfvec({dim}) <=> CAST(:embedding AS halfvec({dim}))"
+    if mode == "binary":
+        return f"binary_quantize({alias}.embedding)::bit({dim}) <~> binary_quantize({query})"
+    return (
+        f"subvector({alias}.embedding, 1, {index_dim})::vector({index_dim}) "
+        f"<=> subvector({query}, 1, {index_dim})"
+    )
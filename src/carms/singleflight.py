@@ -0,0 +1,98 @@
+"""Single-flight coalescing of identical concurrent computations.
+
+When several threads ask for the same key at once (a dashboard auto-refreshing
+across tabs, a popular query), only the first runs the computation; the others
+wait for its result instead of repeating the embedding call, SQL or LLM call.
+Nothing is cached: once the leader finishes, the next call for the key runs
+again. Results are shared between callers and must be treated as read-only.
+"""
+
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from typing import TypeVar
+
+from carms.config import settings
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    """Counters exposed as metrics."""
+
+    calls: int = 0
+    executions: int = 0
+    coalesced: int = 0
+    in_flight: int = 0
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time; concurrent callers share it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = FlightStats()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Return ``fn()``, or the result of an identical call already in flight.
+
+        Exceptions raised by the leader are re-raised in every waiting caller.
+        """
+        if not settings.singleflight_enabled:
+            return fn()
+
+        with self._lock:
+            self._stats.calls += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._stats.executions += 1
+                self._stats.in_flight += 1
+            else:
+                self._stats.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._stats.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Snapshot of coalescing metrics."""
+        with self._lock:
+            return asdict(self._stats)
+
+
+_groups: dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    """Shared ``SingleFlight`` group for ``name`` (e.g. ``"search"``)."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def singleflight_stats() -> dict[str, dict]:
+    """Coalescing metrics for every group used so far."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
@@ -0,0 +1,136 @@
+"""Lightweight per-stage timing spans with Prometheus-style aggregation.
+
+Wrap a stage with ``span("embed")`` or decorate a function with
+``@timed("report")``. Every span is added to a process-wide latency histogram
+per stage, and, when a request is being timed (``start_request()``, done by
+``carms.api.metrics.TimingMiddleware``), to that request's breakdown so it
+can be sent as a ``Server-Timing`` header. Spans outside a request (ETL, CLI)
+only feed the histograms. Nested spans are recorded independently; a stage
+that runs several times in one request is summed.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; roughly log-spaced from 1 ms to 30 s
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative latency histogram (Prometheus semantics) for one label set."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Thread-safe histograms keyed on ``(metric name, label tuple)``."""
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict[tuple[str, tuple[tuple[str, str], ...]], Histogram]:
+        """Copy of every histogram, safe to read without the lock."""
+        with self._lock:
+            copies = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts = list(histogram.counts)
+                copy.count = histogram.count
+                copy.sum = histogram.sum
+                copies[key] = copy
+            return copies
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+STAGE_METRIC = "carms_stage_duration_seconds"
+
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar(
+    "carms_request_timings", default=None
+)
+
+
+def start_request() -> dict[str, float]:
+    """Begin collecting stage timings (ms) for the current request context.
+
+    Returns the dict that spans in this context (including threadpool workers
+    that copy it) accumulate into.
+    """
+    timings: dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record(stage: str, seconds: float) -> None:
+    """Record an externally measured stage duration."""
+    registry.observe(STAGE_METRIC, seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator form of ``span`` for sync and async functions."""
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def server_timing_header(timings: dict[str, float]) -> str:
+    """Format stage timings as a ``Server-Timing`` header value."""
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
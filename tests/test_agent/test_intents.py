@@ -0,0 +1,64 @@
+"""Tests for the deterministic chat fast path."""
+
+import pytest
+
+pytest.importorskip("claude_agent_sdk")
+
+from carms.agent.intents import Intent, answer, classify  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    ("message", "intent"),
+    [
+        ("How many programs are there?", Intent("count", {"what": "programs"})),
+        (
+            "hi, how many CMG programs are there?",
+            Intent("count", {"before": "cmg", "what": "programs"}),
+        ),
+        (
+            "how many programs at the University of Toronto",
+            Intent("count", {"what": "programs", "after": "the university of toronto"}),
+        ),
+        ("Please list the schools", Intent("list_schools")),
+        ("What schools are there?", Intent("list_schools")),
+        ("which specialties do you have", Intent("list_disciplines")),
+        ("Show me program #1234 details", Intent("show_program", {"program_id": "1234"})),
+        ("program 1234", Intent("show_program", {"program_id": "1234"})),
+    ],
+)
+def test_classify_recognizes_lookups(message, intent):
+    assert classify(message) == intent
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "What are the best schools for surgery?",
+        "Compare program 1 and 2",
+        "Find rural family medicine programs",
+        "Show programs like 1234",
+    ],
+)
+def test_classify_leaves_open_questions_to_the_agent(message):
+    assert classify(message) is None
+
+
+def test_count_programs_by_scope(session, sample_program):
+    assert answer(session, classify("how many anesthesiology programs")) == (
+        "There is **1** Anesthesiology program."
+    )
+    assert answer(session, classify("how many programs in St. John's")) == (
+        "There is **1** program in St. John's."
+    )
+    assert answer(session, classify("how many programs at memorial university")) == (
+        "There is **1** program at Memorial University of Newfoundland."
+    )
+    # Unknown scope: unsure, so the agent answers
+    assert answer(session, classify("how many programs in atlantis")) is None
+
+
+def test_show_program(session, sample_program):
+    reply = answer(session, classify(f"show program {sample_program.id}"))
+    assert sample_program.name in reply
+    assert "- Discipline: Anesthesiology" in reply
+    assert answer(session, classify("show program 999999")) == "Program 999999 not found."
@@ -0,0 +1,57 @@
+"""Tests for compact agent tool payloads."""
+
+import json
+
+from carms.agent.payloads import (
+    compact,
+    parse_fields,
+    select_fields,
+    table,
+    tool_result,
+    truncate,
+)
+
+ROWS = [
+    {
+        "program_id": i,
+        "name": f"Family Medicine - Site {i}",
+        "discipline": "Family Medicine",
+        "school": "University of Toronto",
+        "site": "Toronto",
+        "stream": "CMG",
+        "similarity": 0.812,
+    }
+    for i in range(10)
+]
+
+
+def test_truncate_on_word_boundary():
+    text = "Residents rotate through rural sites in the second year of training."
+    cut = truncate(text, 30)
+    assert len(cut) <= 30
+    assert cut.endswith("…")
+    assert cut == "Residents rotate through…"
+    assert truncate("short", 30) == "short"
+    assert truncate(None, 30) is None
+
+
+def test_table_encoding_is_much_smaller_than_indented_json():
+    compact_text = compact(table(ROWS))
+    assert len(compact_text) * 2 < len(json.dumps(ROWS, indent=2))
+    decoded = json.loads(compact_text)
+    assert decoded["columns"][0] == "program_id"
+    assert dict(zip(decoded["columns"], decoded["rows"][3])) == ROWS[3]
+
+
+def test_field_selection_keeps_program_id():
+    rows = select_fields(ROWS, parse_fields("name, school"))
+    assert list(rows[0]) == ["program_id", "name", "school"]
+    assert select_fields(ROWS, parse_fields("")) is ROWS
+
+
+def test_tool_result_logs_size(caplog):
+    with caplog.at_level("INFO", logger="carms.agent.payloads"):
+        result = tool_result("filter_programs", table(ROWS[:2]), note="Found 2 programs:")
+    text = result["content"][0]["text"]
+    assert text.startswith("Found 2 programs:\n{")
+    assert "filter_programs payload" in caplog.text
@@ -0,0 +1,61 @@
+"""Tests for the read queries shared by agent tools and the chat fast path."""
+
+from carms.agent import queries
+from carms.db.models import Discipline, ProgramDescription, ProgramDigest
+
+
+def test_resolve_name_exact_unique_and_ambiguous(session, sample_program):
+    session.add(Discipline(id=90, name="Anesthesiology Research"))
+    session.flush()
+
+    # Exact name wins over a longer partial match
+    assert queries.resolve_name(session, "disciplines", "anesthesiology") == (13, [])
+    assert queries.resolve_name(session, "disciplines", "research") == (90, [])
+    resolved, candidates = queries.resolve_name(session, "disciplines", "anesth")
+    assert resolved is None
+    assert candidates == ["Anesthesiology", "Anesthesiology Research"]
+    assert queries.resolve_name(session, "schools", "nowhere") == (None, [])
+
+
+def test_resolve_name_treats_wildcards_literally(session, sample_program):
+    assert queries._like_pattern("50%_a\\b") == "%50\\%\\_a\\\\b%"
+    # "%" and "_" would otherwise match every discipline
+    assert queries.resolve_name(session, "disciplines", "%") == (None, [])
+    assert queries.resolve_name(session, "disciplines", "_") == (None, [])
+
+
+def test_program_details_batch(session, sample_program):
+    session.add(
+        ProgramDescription(
+            program_id=sample_program.id,
+            interviews="Interviews are held virtually in January.",
+            return_of_service="Not applicable.",
+        )
+    )
+    session.flush()
+
+    details = queries.program_details(session, [sample_program.id, -1])
+    assert [d["program_id"] for d in details] == [sample_program.id]
+    # No digest built: section text is returned instead
+    assert details[0]["interviews"] == "Interviews are held virtually in January."
+
+    session.add(
+        ProgramDigest(
+            program_id=sample_program.id,
+            digest={"interviews": ["Virtual, January."]},
+            summarizer="test",
+            source_hash="x",
+        )
+    )
+    session.flush()
+    (detail,) = queries.program_details(session, [sample_program.id])
+    assert detail["digest"] == {"interviews": ["Virtual, January."]}
+    assert detail["available_sections"] == ["interviews", "return_of_service"]
+    assert "interviews" not in detail
+
+    (detail,) = queries.program_details(
+        session, [sample_program.id], sections=["return_of_service"], full=True
+    )
+    assert "digest" not in detail
+    assert detail["return_of_service"] == "Not applicable."
+    assert "interviews" not in detail
@@ -0,0 +1,127 @@
+"""Tests for the agent session store backends."""
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+
+from carms.agent.pdf_profile import ApplicantProfile, clear_profile, get_profile, store_profile
+from carms.agent.session_store import (
+    DatabaseSessionStore,
+    MemorySessionStore,
+    create_session_store,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _memory(clock=None, max_entries=100, max_bytes=10_000, ttl=60.0):
+    return MemorySessionStore(
+        "test", ttl, max_entries=max_entries, max_bytes=max_bytes, clock=clock or Clock()
+    )
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = _memory(max_entries=2)
+    store.set("a", "1")
+    store.set("b", "2")
+    assert store.get("a") == "1"  # "b" is now least recently used
+    store.set("c", "3")
+    assert store.get("b") is None
+    assert store.get("a") == "1"
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["entries"] == 2
+
+
+def test_memory_store_bounded_by_bytes():
+    store = _memory(max_bytes=200)
+    for i in range(10):
+        store.set(f"s{i}", {"text": "x" * 40})
+    stats = store.stats()
+    assert stats["bytes"] <= 200
+    assert stats["entries"] == 3
+    assert store.get("s9") == {"text": "x" * 40}
+
+    store.delete("s9")
+    assert store.stats()["entries"] == 2
+    assert store.stats()["bytes"] < stats["bytes"]
+
+
+def test_memory_store_expires_after_ttl():
+    clock = Clock()
+    store = _memory(clock=clock, ttl=60.0)
+    store.set("a", "1")
+    clock.now += 59
+    assert store.get("a") == "1"
+    clock.now += 2
+    assert store.get("a") is None
+    assert store.stats()["expirations"] == 1
+    assert store.stats()["entries"] == 0
+
+
+def test_database_store_shared_between_instances(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    clock = Clock()
+    writer = DatabaseSessionStore("claude_sessions", 60.0, engine, clock=clock)
+    reader = DatabaseSessionStore("claude_sessions", 60.0, engine, clock=clock)
+    other = DatabaseSessionStore("profiles", 60.0, engine, clock=clock)
+
+    writer.set("sess-1", "claude-abc")
+    writer.set("sess-1", "claude-def")
+    assert reader.get("sess-1") == "claude-def"
+    assert other.get("sess-1") is None
+    assert reader.stats()["entries"] == 1
+
+    clock.now += 61
+    assert reader.get("sess-1") is None
+    writer.set("sess-2", "claude-ghi")  # purges the expired row
+    assert writer.stats()["expirations"] == 1
+
+    writer.delete("sess-2")
+    assert reader.get("sess-2") is None
+
+
+def test_database_store_concurrent_first_writes(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'sessions.db'}", connect_args={"check_same_thread": False}
+    )
+    stores = [DatabaseSessionStore("claude_sessions", 60.0, engine) for _ in range(8)]
+    assert stores[0].get("sess-0") is None  # creates the table
+    errors = []
+
+    def write(store, value):
+        try:
+            for i in range(20):
+                store.set(f"sess-{i}", value)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(store, n)) for n, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert stores[0].stats()["entries"] == 20
+
+
+def test_create_session_store_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown session store backend"):
+        create_session_store("test", backend="redis")
+
+
+def test_profile_round_trips_through_store():
+    profile = ApplicantProfile(
+        session_id="sess-store", filename="cv.pdf", disciplines_of_interest=["Pediatrics"]
+    )
+    store_profile(profile)
+    assert get_profile("sess-store") == profile
+    clear_profile("sess-store")
+    assert get_profile("sess-store") is None
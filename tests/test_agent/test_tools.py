@@ -0,0 +1,60 @@
+"""Tests for agent tool offloading and helpers."""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("claude_agent_sdk")
+
+from carms.agent import tools  # noqa: E402
+
+
+@tools.offloaded("slow_tool")
+def slow_tool(args: dict) -> dict:
+    time.sleep(args["seconds"])
+    return {"content": [{"type": "text", "text": "done"}]}
+
+
+async def _heartbeat(stop: asyncio.Event) -> float:
+    """Largest delay between event-loop ticks while tools run."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - start - 0.01)
+    return worst
+
+
+async def _run_concurrently(calls: int, seconds: float) -> tuple[float, float]:
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(slow_tool({"seconds": seconds}) for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await heartbeat
+
+
+def test_concurrent_tool_calls_do_not_serialize_or_block_the_loop():
+    elapsed, worst_lag = asyncio.run(_run_concurrently(calls=4, seconds=0.2))
+    assert elapsed < 0.2 * 2  # 4 sequential calls would take 0.8s
+    assert worst_lag < 0.1
+
+
+def test_tool_timeout_returns_error_result(monkeypatch):
+    monkeypatch.setattr(tools.settings, "agent_tool_timeout_seconds", 0.05)
+    result = asyncio.run(slow_tool({"seconds": 0.3}))
+    assert result["is_error"] is True
+    assert "timed out" in result["content"][0]["text"]
+
+
+def test_parse_ids():
+    assert tools._parse_ids("12, 34,") == [12, 34]
+    assert tools._parse_ids("12, abc") is None
+
+
+def test_similar_programs_only_requires_program_id():
+    schema = tools.similar_programs.input_schema
+    assert schema["required"] == ["program_id"]
+    assert set(schema["properties"]) == {"program_id", "top_k", "same_discipline"}
@@ -184,3 +184,23 @@ def test_chat_message_max_length(client):
             json={"message": "x" * 10001, "session_id": "test"},
         )
         assert response.status_code == 422
+
+
+def test_chat_fast_path_skips_agent(client):
+    """Simple lookups are answered with the same SSE events, without an agent client."""
+    with (
+        patch("carms.api.routers.agent.is_agent_available", return_value=True),
+        patch("carms.api.routers.agent.route_message", return_value="There are **815** programs."),
+        patch("carms.api.routers.agent.create_client", new_callable=AsyncMock) as mock_create,
+    ):
+        response = client.post(
+            "/agent/chat",
+            json={"message": "How many programs are there?", "session_id": "fast"},
+        )
+        assert response.status_code == 200
+        mock_create.assert_not_called()
+        body = response.text
+        assert "event: text" in body
+        assert "There are **815** programs." in body
+        assert "event: result" in body
+        assert '"session_id": "fast"' in body
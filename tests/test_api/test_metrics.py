@@ -0,0 +1,21 @@
+"""Test Server-Timing headers and the /metrics endpoint."""
+
+
+def test_server_timing_header_on_search(client, sample_program):
+    response = client.post("/search/", json={"query": "rural", "mode": "lexical"})
+    assert response.status_code == 200
+    header = response.headers["server-timing"]
+    assert "sql;dur=" in header
+    assert "serialize;dur=" in header
+    assert "total;dur=" in header
+
+
+def test_metrics_exposes_route_and_stage_histograms(client):
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'carms_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert "carms_stage_duration_seconds_bucket" in body
+    assert "carms_db_pool_checkedout" in body
@@ -38,3 +38,95 @@ def test_get_program_detail(client, sample_program):
 def test_get_program_not_found(client):
     response = client.get("/programs/99999")
     assert response.status_code == 404
+
+
+def test_get_program_sparse_fields(client, sample_program):
+    response = client.get(f"/programs/{sample_program.id}?fields=name,school")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"id", "name", "school"}
+
+
+def test_get_program_sections_only(client, sample_program, session):
+    from carms.db.models import ProgramDescription
+
+    session.add(
+        ProgramDescription(
+            program_id=sample_program.id,
+            interviews="Virtual interviews in January.",
+            full_markdown="# Very long document",
+        )
+    )
+    session.flush()
+
+    response = client.get(f"/programs/{sample_program.id}?sections=interviews")
+    assert response.status_code == 200
+    description = response.json()["description"]
+    assert description == {"interviews": "Virtual interviews in January."}
+
+
+def test_get_program_unknown_section(client, sample_program):
+    response = client.get(f"/programs/{sample_program.id}?sections=nope")
+    assert response.status_code == 400
+
+
+def test_get_programs_batch(client, sample_program):
+    response = client.get(f"/programs/batch?ids={sample_program.id},99999")
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["id"] for p in data] == [sample_program.id]
+    assert data[0]["discipline"] == "Anesthesiology"
+
+
+def test_post_programs_batch_sparse(client, sample_program):
+    response = client.post("/programs/batch", json={"ids": [sample_program.id], "fields": ["name"]})
+    assert response.status_code == 200
+    assert response.json() == [{"id": sample_program.id, "name": sample_program.name}]
+
+
+def test_get_programs_batch_invalid_ids(client):
+    response = client.get("/programs/batch?ids=1,abc")
+    assert response.status_code == 400
+
+
+def test_similar_programs_not_found(client):
+    response = client.get("/programs/99999/similar")
+    assert response.status_code == 404
+
+
+def test_similar_programs(client, sample_program, session):
+    from carms.db.models import Program, ProgramCentroid
+
+    other = Program(
+        discipline_id=sample_program.discipline_id,
+        school_id=sample_program.school_id,
+        program_stream_id="27448",
+        site="Corner Brook",
+        stream="CMG Stream for CMG",
+        name="Memorial University / Anesthesiology / Corner Brook / CMG Stream",
+    )
+    session.add(other)
+    session.flush()
+    session.add_all(
+        [
+            ProgramCentroid(
+                program_id=sample_program.id,
+                discipline_id=sample_program.discipline_id,
+                chunk_count=1,
+                centroid=[0.1] * 1536,
+            ),
+            ProgramCentroid(
+                program_id=other.id,
+                discipline_id=other.discipline_id,
+                chunk_count=1,
+                centroid=[0.1] * 1535 + [0.2],
+            ),
+        ]
+    )
+    session.flush()
+
+    response = client.get(f"/programs/{sample_program.id}/similar?k=5&same_discipline=true")
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["program_id"] for p in data] == [other.id]
+    assert data[0]["similarity"] > 0.9
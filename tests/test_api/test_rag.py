@@ -0,0 +1,13 @@
+"""Test RAG endpoints."""
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [{"mode": "map_reduce"}, {"discipline_id": 1}, {"site": "Sudbury"}, {"max_programs": 5}],
+)
+def test_stream_rejects_map_reduce_options(client, extra):
+    response = client.post("/rag/ask/stream", json={"question": "Rural rotations?", **extra})
+    assert response.status_code == 400
+    assert "map_reduce" in response.json()["detail"]
@@ -0,0 +1,22 @@
+"""Tests for the fast JSON response class."""
+
+import json
+
+from carms.api.responses import FastJSONResponse
+
+
+def test_fast_json_response_renders_json():
+    response = FastJSONResponse({"id": 1, "name": "Program", "tags": ["a", "b"]})
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"id": 1, "name": "Program", "tags": ["a", "b"]}
+
+
+def test_fast_json_response_nan_is_null():
+    response = FastJSONResponse({"coverage_pct": float("nan")})
+    assert json.loads(response.body) == {"coverage_pct": None}
+
+
+def test_stdlib_fallback_nan_is_null(monkeypatch):
+    monkeypatch.setattr("carms.api.responses.orjson", None)
+    response = FastJSONResponse({"rows": [{"pct": float("inf")}, {"pct": 1.5}], "n": float("nan")})
+    assert json.loads(response.body) == {"rows": [{"pct": None}, {"pct": 1.5}], "n": None}
@@ -14,3 +14,24 @@ def test_search_valid_request(client, sample_program):
     assert "results" in data
     assert "count" in data
     assert data["query"] == "family medicine rural"
+
+
+def test_search_debug_reports_plan(client, sample_program):
+    response = client.post(
+        "/search/",
+        json={"query": "rural", "discipline_id": sample_program.discipline_id, "debug": True},
+    )
+    assert response.status_code == 200
+    assert response.json()["debug"]["plan"]["strategy"] == "exact"
+
+
+def test_embedding_batcher_stats(client):
+    response = client.get("/health/embeddings")
+    assert response.status_code == 200
+    assert "enabled" in response.json()
+
+
+def test_search_facets(client, sample_program):
+    response = client.post("/search/", json={"query": "rural", "facets": True})
+    assert response.status_code == 200
+    assert set(response.json()["facets"]) == {"discipline", "school", "site", "stream"}
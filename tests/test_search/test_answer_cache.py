@@ -0,0 +1,32 @@
+"""Tests for the RAG answer cache."""
+
+from unittest.mock import patch
+
+from carms.search.answer_cache import HIT, MISS, AnswerCache, answer_cache_key
+
+EVIDENCE = [(1, "Rural rotations in second year."), (2, "Return of service applies.")]
+
+
+def test_key_ignores_question_formatting_and_evidence_order():
+    key = answer_cache_key("Return of service?", 8, EVIDENCE, "1:10", "model")
+    assert key == answer_cache_key("return of service", 8, EVIDENCE[::-1], "1:10", "model")
+
+
+def test_key_changes_with_evidence_version_and_k():
+    key = answer_cache_key("q", 8, EVIDENCE, "1:10", "model")
+    assert key != answer_cache_key("q", 8, EVIDENCE[:1], "1:10", "model")
+    assert key != answer_cache_key("q", 8, [(1, "Rural rotations in third year.")], "1:10", "m")
+    assert key != answer_cache_key("q", 8, EVIDENCE, "2:10", "model")
+    assert key != answer_cache_key("q", 4, EVIDENCE, "1:10", "model")
+
+
+def test_memory_tier_lru_and_ttl():
+    cache = AnswerCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", "q", "A")
+    cache.put("b", "q", "B")
+    assert cache.get("a") == ("A", HIT)
+    cache.put("c", "q", "C")
+    assert cache.get("b") == (None, MISS)
+
+    with patch("carms.search.answer_cache.time.time", return_value=10**12):
+        assert cache.get("a") == (None, MISS)
@@ -0,0 +1,72 @@
+"""Tests for the query embedding micro-batcher."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from carms.search.batching import EmbeddingBatcher
+
+
+class RecordingProvider:
+    dimension = 3
+
+    def __init__(self, fail: bool = False):
+        self.calls: list[list[str]] = []
+        self.fail = fail
+        self.release = threading.Event()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.release.wait(timeout=5)
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [[float(len(t)), 0.0, 1.0] for t in texts]
+
+
+def test_concurrent_queries_share_a_batch():
+    provider = RecordingProvider()
+    batcher = EmbeddingBatcher(provider, max_batch_size=16, max_wait_ms=50, workers=1)
+    try:
+        texts = [f"query {'x' * i}" for i in range(8)]
+        futures = [batcher.submit(t) for t in texts]
+        provider.release.set()
+        vectors = [f.result(timeout=5) for f in futures]
+    finally:
+        batcher.close()
+
+    assert vectors == [[float(len(t)), 0.0, 1.0] for t in texts]
+    assert len(provider.calls) == 1
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["items"] == 8
+    assert stats["max_batch_size"] == 8
+
+
+def test_batch_respects_max_size():
+    provider = RecordingProvider()
+    provider.release.set()
+    batcher = EmbeddingBatcher(provider, max_batch_size=4, max_wait_ms=20, workers=1)
+    try:
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(batcher.embed_query, [str(i) for i in range(10)]))
+    finally:
+        batcher.close()
+
+    assert len(results) == 10
+    assert all(len(call) <= 4 for call in provider.calls)
+
+
+def test_provider_error_propagates_to_callers():
+    provider = RecordingProvider(fail=True)
+    provider.release.set()
+    batcher = EmbeddingBatcher(provider, max_batch_size=4, max_wait_ms=1, workers=1)
+    try:
+        with pytest.raises(RuntimeError, match="provider down"):
+            batcher.embed_query("hello", timeout=5)
+    finally:
+        batcher.close()
+    assert batcher.stats()["errors"] == 1
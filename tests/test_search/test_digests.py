@@ -0,0 +1,91 @@
+"""Tests for program digests."""
+
+import pytest
+
+from carms.db.models import ProgramDigest
+from carms.search.digests import (
+    ExtractiveSummarizer,
+    create_summarizer,
+    digest_sections,
+    load_digests,
+    source_hash,
+)
+
+INTERVIEWS = """## Interviews
+Thank you for your interest in our program.
+- Interviews will be held virtually on January 20 and 21, 2025.
+- Each applicant meets two panels of faculty and residents.
+We look forward to meeting you.
+"""
+
+RETURN_OF_SERVICE = "Not applicable. There is no return of service agreement for this program."
+
+
+def test_extractive_keeps_informative_sentences_in_order():
+    digest = ExtractiveSummarizer(max_facts=2).summarize({"interviews": INTERVIEWS})
+    assert digest == {
+        "interviews": [
+            "Interviews will be held virtually on January 20 and 21, 2025.",
+            "Each applicant meets two panels of faculty and residents.",
+        ]
+    }
+
+
+def test_extractive_is_deterministic_and_bounded():
+    summarizer = ExtractiveSummarizer(max_facts=3, fact_chars=40)
+    sections = {"interviews": INTERVIEWS, "return_of_service": RETURN_OF_SERVICE}
+    first = summarizer.summarize(sections)
+    assert first == summarizer.summarize(dict(sections))
+    assert all(len(fact) <= 40 for facts in first.values() for fact in facts)
+    assert first["return_of_service"][0] == "Not applicable."
+
+
+def test_extractive_falls_back_to_first_sentence():
+    sections = {"training_sites": "## Sites\nTBD\nPlease contact the office for details."}
+    assert ExtractiveSummarizer().summarize(sections) == {
+        "training_sites": ["Please contact the office for details."]
+    }
+    assert ExtractiveSummarizer().summarize({"training_sites": "TBD"}) == {}
+
+
+def test_digest_sections_maps_columns_and_drops_empty():
+    row = {
+        "interviews": INTERVIEWS,
+        "program_highlights": "  ",
+        "supporting_documentation_information": "Three reference letters.",
+    }
+    assert digest_sections(row) == {
+        "interviews": INTERVIEWS.strip(),
+        "supporting_docs": "Three reference letters.",
+    }
+
+
+def test_source_hash_tracks_text_summarizer_and_limits():
+    sections = {"interviews": INTERVIEWS}
+    base = source_hash(sections, ExtractiveSummarizer())
+    assert base == source_hash(dict(sections), ExtractiveSummarizer())
+    assert base != source_hash({"interviews": INTERVIEWS + "!"}, ExtractiveSummarizer())
+    assert base != source_hash(sections, ExtractiveSummarizer(max_facts=5))
+    assert base != source_hash(sections, ExtractiveSummarizer(fact_chars=80))
+
+    class Other(ExtractiveSummarizer):
+        name = "other"
+
+    assert base != source_hash(sections, Other())
+
+
+def test_create_summarizer_rejects_unknown_backend():
+    assert isinstance(create_summarizer("extractive"), ExtractiveSummarizer)
+    with pytest.raises(ValueError, match="Unknown digest summarizer"):
+        create_summarizer("bogus")
+
+
+def test_load_digests(session, sample_program):
+    digest = {"interviews": ["Virtual, January 20."]}
+    session.add(
+        ProgramDigest(
+            program_id=sample_program.id, digest=digest, summarizer="test", source_hash="x"
+        )
+    )
+    session.flush()
+    assert load_digests(session, [sample_program.id, -1]) == {sample_program.id: digest}
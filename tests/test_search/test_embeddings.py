@@ -0,0 +1,128 @@
+"""Tests for embedding provider selection."""
+
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from carms.config import settings
+from carms.search import embeddings
+from carms.search.embeddings import (
+    LocalEmbeddingProvider,
+    QueryEmbeddingCache,
+    create_embedding_provider,
+    normalize_query,
+)
+
+# Bound at import, before the autouse ``mock_embed_query`` fixture patches the module attribute
+real_embed_query = embeddings.embed_query
+
+
+def _fake_sentence_transformers(dimension: int) -> SimpleNamespace:
+    model = MagicMock()
+    model.get_sentence_embedding_dimension.return_value = dimension
+    model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), dimension))
+    return SimpleNamespace(SentenceTransformer=MagicMock(return_value=model))
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        create_embedding_provider("nope", "model", 384)
+
+
+def test_local_provider_embeds_and_loads_once(monkeypatch):
+    fake = _fake_sentence_transformers(384)
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake)
+
+    provider = create_embedding_provider("local", "all-MiniLM-L6-v2", 384, runtime="onnx")
+    assert isinstance(provider, LocalEmbeddingProvider)
+    assert len(provider.embed_query("rural medicine")) == 384
+    assert len(provider.embed_documents(["a", "b"])) == 2
+
+    fake.SentenceTransformer.assert_called_once_with(
+        "all-MiniLM-L6-v2", device="cpu", backend="onnx"
+    )
+
+
+def test_local_provider_dimension_mismatch(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", _fake_sentence_transformers(768))
+
+    provider = create_embedding_provider("local", "some-model", 384)
+    with pytest.raises(ValueError, match="EMBEDDING_DIM"):
+        provider.embed_query("hello")
+
+
+def _fake_langchain_openai(dimension: int) -> SimpleNamespace:
+    model = MagicMock()
+    model.embed_query.return_value = [0.0] * dimension
+    model.embed_documents.side_effect = lambda texts: [[0.0] * dimension for _ in texts]
+    return SimpleNamespace(OpenAIEmbeddings=MagicMock(return_value=model))
+
+
+def test_openai_provider_requests_dimension(monkeypatch):
+    fake = _fake_langchain_openai(512)
+    monkeypatch.setitem(sys.modules, "langchain_openai", fake)
+
+    provider = create_embedding_provider("openai", "text-embedding-3-small", 512, "key")
+    assert len(provider.embed_query("rural medicine")) == 512
+    fake.OpenAIEmbeddings.assert_called_once_with(
+        model="text-embedding-3-small", dimensions=512, openai_api_key="key"
+    )
+
+
+def test_openai_provider_dimension_mismatch(monkeypatch):
+    monkeypatch.setitem(sys.modules, "langchain_openai", _fake_langchain_openai(1536))
+
+    provider = create_embedding_provider("openai", "text-embedding-ada-002", 384)
+    with pytest.raises(ValueError, match="EMBEDDING_DIM"):
+        provider.embed_documents(["hello"])
+
+
+def test_normalize_query_ignores_case_and_punctuation():
+    assert normalize_query("  Rural   Medicine?! ") == normalize_query("rural medicine")
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryEmbeddingCache(maxsize=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+
+
+class StallingProvider:
+    dimension = 2
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def embed_query(self, text: str) -> list[float]:
+        self.release.wait(timeout=5)
+        return [1.0, 0.0]
+
+
+def test_embed_query_deadline_then_cached(monkeypatch):
+    assert not isinstance(real_embed_query, MagicMock)
+    provider = StallingProvider()
+    monkeypatch.setattr(settings, "embedding_batch_enabled", False)
+    monkeypatch.setattr(embeddings, "get_embedding_provider", lambda: provider)
+    embeddings.query_embedding_cache.clear()
+    try:
+        with pytest.raises(TimeoutError):
+            real_embed_query("Rural medicine", timeout=0.01)
+
+        # The stalled call finishes in the background and fills the cache
+        provider.release.set()
+        deadline = time.monotonic() + 5
+        while embeddings.query_embedding_cache.get("rural medicine") is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+        assert real_embed_query("rural medicine?", timeout=0.01) == [1.0, 0.0]
+    finally:
+        embeddings.query_embedding_cache.clear()
@@ -0,0 +1,89 @@
+"""Tests for map-reduce RAG with a local stub LLM."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("langchain_anthropic")
+
+from langchain_core.messages import AIMessage  # noqa: E402
+
+from carms.search import map_reduce  # noqa: E402
+from carms.search.retriever import SearchResult  # noqa: E402
+
+
+class StubLLM:
+    """Answers map prompts after a delay and records peak concurrency."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.prompts: list[str] = []
+
+    async def ainvoke(self, prompt: str) -> AIMessage:
+        self.prompts.append(prompt)
+        if "Notes:" not in prompt:
+            return AIMessage(content="Combined answer.")
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if "Program 3" in prompt:
+            return AIMessage(content="NOT RELEVANT")
+        return AIMessage(content="Panel interviews, virtual.")
+
+
+def _program(i: int) -> SearchResult:
+    return SearchResult(
+        program_id=i,
+        program_name=f"Psychiatry - Program {i}",
+        discipline="Psychiatry",
+        school="University",
+        site="Toronto",
+        stream="CMG",
+        chunk_text=f"Interview details for program {i}.",
+        similarity=0.9 - i / 100,
+        snippets=[f"Interview details for program {i}."],
+    )
+
+
+def test_map_calls_run_concurrently_and_reduce_once():
+    llm = StubLLM(delay=0.2)
+    programs = [_program(i) for i in range(1, 7)]
+    with patch.object(map_reduce, "select_programs", return_value=programs):
+        start = time.perf_counter()
+        result = asyncio.run(
+            map_reduce.amap_reduce_ask("Compare psychiatry interview formats", llm=llm)
+        )
+        elapsed = time.perf_counter() - start
+
+    assert result["answer"] == "Combined answer."
+    assert result["programs"] == 6
+    # Program 3 said NOT RELEVANT, so it is left out of the reduce and sources
+    assert len(result["sources"]) == 5
+    assert "Program 3" not in llm.prompts[-1]
+    assert llm.peak == 6
+    assert elapsed < 0.2 * 3  # far below 6 sequential calls
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(map_reduce.settings, "rag_map_concurrency", 2)
+    llm = StubLLM(delay=0.05)
+    with patch.object(map_reduce, "select_programs", return_value=[_program(i) for i in range(6)]):
+        asyncio.run(map_reduce.amap_reduce_ask("q", llm=llm))
+    assert llm.peak == 2
+
+
+def test_no_programs():
+    with patch.object(map_reduce, "select_programs", return_value=[]):
+        result = asyncio.run(map_reduce.amap_reduce_ask("q", llm=StubLLM()))
+    assert result["programs"] == 0
+    assert result["sources"] == []
+
+
+def test_infer_filters_from_discipline_name(session, sample_program):
+    filters = map_reduce.infer_filters(session, "Compare interviews across anesthesiology programs")
+    assert filters["discipline_id"] == sample_program.discipline_id
@@ -0,0 +1,70 @@
+"""Tests for RAG context packing."""
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from carms.search.packing import (  # noqa: E402
+    estimate_tokens,
+    format_passage,
+    merge_adjacent,
+    pack_documents,
+    remove_near_duplicates,
+)
+
+FIRST = "Residents complete core rotations in Sudbury and spend two blocks in remote northern"
+SECOND = "spend two blocks in remote northern communities with Indigenous health partners."
+
+
+def _doc(text, program_id=1, name="Family Medicine - Sudbury", similarity=0.9):
+    return Document(
+        page_content=text,
+        metadata={"program_id": program_id, "program_name": name, "similarity": similarity},
+    )
+
+
+def test_overlapping_chunks_of_one_program_are_stitched():
+    merged = merge_adjacent([_doc(SECOND, similarity=0.8), _doc(FIRST, similarity=0.9)])
+    assert len(merged) == 1
+    assert merged[0].page_content == (
+        "Residents complete core rotations in Sudbury and spend two blocks in remote northern"
+        " communities with Indigenous health partners."
+    )
+    assert merged[0].metadata["similarity"] == 0.9
+
+
+def test_chunks_of_different_programs_are_not_stitched():
+    assert len(merge_adjacent([_doc(FIRST), _doc(SECOND, program_id=2)])) == 2
+
+
+def test_twin_program_boilerplate_is_deduplicated():
+    text = "Applicants must submit three reference letters and a personal letter. " * 3
+    docs = remove_near_duplicates(
+        [
+            _doc(text, program_id=1, name="Psychiatry - CMG"),
+            _doc(text + "IMG stream.", program_id=2, name="Psychiatry - IMG"),
+        ],
+        threshold=0.8,
+    )
+    assert len(docs) == 1
+    assert docs[0].metadata["also_programs"] == ["Psychiatry - IMG"]
+    assert "(also: Psychiatry - IMG)" in format_passage(docs[0])
+
+
+def test_budget_is_filled_in_similarity_order():
+    docs = [
+        _doc("a " * 200, program_id=1, similarity=0.5),
+        _doc("b " * 200, program_id=2, similarity=0.9),
+        _doc("c " * 20, program_id=3, similarity=0.7),
+    ]
+    packed = pack_documents(docs, token_budget=150)
+    assert [d.metadata["program_id"] for d in packed] == [2, 3]
+    assert sum(estimate_tokens(format_passage(d)) for d in packed) <= 150
+
+
+def test_best_passage_is_truncated_when_nothing_fits():
+    packed = pack_documents([_doc("x" * 4000)], token_budget=100)
+    assert len(packed) == 1
+    assert len(packed[0].page_content) == 400
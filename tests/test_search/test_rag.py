@@ -0,0 +1,69 @@
+"""Tests for the reusable, streaming RAG pipeline (stub LLM, no API calls)."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("langchain_anthropic")
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+
+from carms.search import rag  # noqa: E402
+
+DOCS = [
+    Document(
+        page_content="Rural rotations are available in second year.",
+        metadata={"program_name": "Family Medicine - Sudbury", "similarity": 0.91},
+    )
+]
+
+
+def _doc_copy() -> Document:
+    return Document(page_content=DOCS[0].page_content, metadata=dict(DOCS[0].metadata))
+
+
+def _stub_llm(answer: str) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter([AIMessage(content=answer)]))
+
+
+async def _collect(question: str) -> list[tuple[str, object]]:
+    return [event async for event in rag.astream_answer(question, k=4)]
+
+
+def test_stream_yields_sources_then_tokens_then_done():
+    with (
+        patch.object(rag, "retrieve_documents", return_value=DOCS) as mock_retrieve,
+        patch.object(rag, "get_llm", return_value=_stub_llm("Yes, in second year.")),
+        patch.object(rag, "lookup_answer", return_value=(None, None, "bypass")),
+    ):
+        events = asyncio.run(_collect("Are there rural rotations?"))
+
+    mock_retrieve.assert_called_once_with("Are there rural rotations?", 4)
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "sources"
+    assert kinds[-1] == "done"
+    assert kinds.count("token") > 1
+    assert events[0][1][0]["program_name"] == "Family Medicine - Sudbury"
+    tokens = "".join(payload for kind, payload in events if kind == "token")
+    assert tokens == events[-1][1]["answer"] == "Yes, in second year."
+
+
+def test_second_ask_is_served_from_cache():
+    llm = _stub_llm("Two programs require return of service.")
+    rag.answer_cache.clear()
+    with (
+        patch.object(rag, "retrieve_documents", side_effect=lambda q, k: [_doc_copy()]),
+        patch.object(rag, "dataset_version", return_value="1:100"),
+        patch.object(rag, "get_llm", return_value=llm),
+        patch.object(rag.settings, "rag_cache_enabled", True),
+    ):
+        first = rag.ask("Which programs have return of service?", k=4)
+        second = rag.ask("which programs have return of service", k=4)
+
+    assert first["cache"] == "miss"
+    assert second["cache"] == "hit"
+    assert second["answer"] == first["answer"]
+    rag.answer_cache.clear()
@@ -1,5 +1,7 @@
 """Tests for SearchService retriever."""
 
+from unittest.mock import patch
+
 import pytest
 
 from carms.db.models import ProgramDescription, ProgramEmbedding
@@ -17,16 +19,33 @@ def sample_embedding(session, sample_program):
     session.add(desc)
     session.flush()
 
-    # 1536-dim zero vector (OpenAI text-embedding-3-small dimensions)
-    zero_vector = [0.0] * 1536
+    # 1536-dim vector (OpenAI text-embedding-3-small dimensions), parallel to the mocked query
+    vector = [0.1] * 1536
     emb = ProgramEmbedding(
         program_id=sample_program.id,
         description_id=desc.id,
         chunk_index=0,
         chunk_text="Excellent rural training opportunities in family medicine.",
-        embedding=zero_vector,
+        discipline_id=sample_program.discipline_id,
+        school_id=sample_program.school_id,
+        site_normalized=sample_program.site.lower(),
+        is_cmg=True,
+        embedding=vector,
     )
     session.add(emb)
+    session.add(
+        ProgramEmbedding(
+            program_id=sample_program.id,
+            description_id=desc.id,
+            chunk_index=1,
+            chunk_text="Rural rotations are available in second year.",
+            discipline_id=sample_program.discipline_id,
+            school_id=sample_program.school_id,
+            site_normalized=sample_program.site.lower(),
+            is_cmg=True,
+            embedding=[0.1] * 1535 + [0.2],
+        )
+    )
     session.flush()
     return emb
 
@@ -61,3 +80,88 @@ class TestSearchService:
         service = SearchService(session)
         results = service.search("rural", top_k=5, site="Nonexistent City XYZ")
         assert results == []
+
+    def test_denormalized_filters_match(self, session, sample_embedding):
+        service = SearchService(session)
+        results = service.search(
+            "rural",
+            top_k=5,
+            discipline_id=sample_embedding.discipline_id,
+            site="st. john",
+            stream="CMG",
+        )
+        assert {r.program_id for r in results} == {sample_embedding.program_id}
+
+    def test_stream_filter_excludes(self, session, sample_embedding):
+        service = SearchService(session)
+        results = service.search("rural", top_k=5, stream="IMG")
+        assert results == []
+
+    def test_unfiltered_search_uses_hnsw(self, session, sample_embedding):
+        service = SearchService(session)
+        service.search("rural", top_k=5)
+        assert service.last_plan.strategy == "hnsw"
+
+    def test_selective_filter_uses_exact_scan(self, session, sample_embedding):
+        service = SearchService(session)
+        results = service.search("rural", top_k=5, school_id=sample_embedding.school_id)
+        assert service.last_plan.strategy == "exact"
+        assert service.last_plan.filtered_rows == 2
+        assert len(results) == 2
+
+    def test_group_by_program_returns_distinct_programs(self, session, sample_embedding):
+        service = SearchService(session)
+        results = service.search("rural", top_k=5, group_by="program", chunks_per_program=2)
+        assert [r.program_id for r in results] == [sample_embedding.program_id]
+        assert results[0].chunk_text == sample_embedding.chunk_text
+        assert len(results[0].snippets) == 2
+
+    def test_invalid_group_by(self, session, sample_embedding):
+        service = SearchService(session)
+        with pytest.raises(ValueError):
+            service.search("rural", group_by="school")
+
+    def test_lexical_search_skips_embedding(self, session, sample_embedding):
+        service = SearchService(session)
+        with patch("carms.search.retriever.embed_query") as mock_embed:
+            results = service.search("rotations", top_k=5, mode="lexical")
+        mock_embed.assert_not_called()
+        assert [r.chunk_text for r in results] == ["Rural rotations are available in second year."]
+        assert service.last_plan.strategy == "lexical"
+
+    def test_hybrid_search_fuses_both_retrievers(self, session, sample_embedding):
+        service = SearchService(session)
+        results = service.search("rotations", top_k=5, mode="hybrid")
+        assert len(results) == 2
+        # The lexical match ranks high in both lists, so it wins the fusion
+        assert results[0].chunk_text == "Rural rotations are available in second year."
+
+    def test_embedding_failure_falls_back_to_lexical(self, session, sample_embedding):
+        service = SearchService(session)
+        with patch("carms.search.retriever.embed_query", side_effect=RuntimeError("down")):
+            results = service.search("rotations", top_k=5)
+        assert service.last_plan.fallback == "lexical"
+        assert len(results) == 1
+
+    def test_facets_count_distinct_programs(self, session, sample_embedding):
+        service = SearchService(session)
+        results = service.search("rural", top_k=1, facets=True)
+        assert len(results) == 1
+        facets = service.last_facets
+        assert set(facets) == {"discipline", "school", "site", "stream"}
+        # Both chunks belong to one program, so every facet counts it once
+        assert [f["count"] for f in facets["school"]] == [1]
+        assert facets["stream"][0]["value"] == "CMG Stream for CMG"
+
+    def test_facets_empty_when_no_candidates(self, session, sample_embedding):
+        service = SearchService(session)
+        service.search("rural", discipline_id=99999, facets=True)
+        assert service.last_facets == {"discipline": [], "school": [], "site": [], "stream": []}
+
+    def test_embedding_timeout_degrades_to_lexical(self, session, sample_embedding):
+        service = SearchService(session)
+        with patch("carms.search.retriever.embed_query", side_effect=TimeoutError):
+            results = service.search("rotations", top_k=5)
+        assert service.last_plan.degraded == "embedding_timeout"
+        assert service.last_plan.strategy == "lexical"
+        assert len(results) == 1
@@ -0,0 +1,39 @@
+"""Tests for compact vector index DDL and shortlist expressions."""
+
+import pytest
+
+from carms.search.vector_index import index_ddl, index_name, shortlist_distance
+
+
+def test_full_mode_has_no_shortlist():
+    assert shortlist_distance("full", 1536) is None
+    assert "vector_cosine_ops" in index_ddl("full", 1536)
+    assert index_name("full") == "ix_program_embeddings_hnsw"
+
+
+@pytest.mark.parametrize(
+    ("mode", "index_fragment", "query_fragment"),
+    [
+        ("halfvec", "(embedding::halfvec(1536)) halfvec_cosine_ops", "pe.embedding::halfvec(1536)"),
+        ("binary", "(binary_quantize(embedding)::bit(1536)) bit_hamming_ops", "<~>"),
+        (
+            "truncated",
+            "(subvector(embedding, 1, 512)::vector(512))",
+            "subvector(pe.embedding, 1, 512)",
+        ),
+    ],
+)
+def test_compact_modes(mode, index_fragment, query_fragment):
+    assert index_fragment in index_ddl(mode, 1536, 512)
+    assert index_name(mode) in index_ddl(mode, 1536, 512)
+    assert query_fragment in shortlist_distance(mode, 1536, 512)
+
+
+def test_truncated_requires_dim():
+    with pytest.raises(ValueError, match="VECTOR_INDEX_DIM"):
+        index_ddl("truncated", 1536)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        shortlist_distance("pq", 1536)
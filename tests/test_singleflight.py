@@ -0,0 +1,69 @@
+"""Tests for single-flight request coalescing."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from carms.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"rows": 3}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "report", compute) for _ in range(8)]
+        while flight.stats()["calls"] < 8:
+            time.sleep(0.001)
+        release.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    stats = flight.stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 7
+    assert stats["in_flight"] == 0
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["executions"] == 2
+
+
+def test_results_are_not_cached():
+    flight = SingleFlight("test")
+    counter = iter(range(10))
+    assert flight.do("k", lambda: next(counter)) == 0
+    assert flight.do("k", lambda: next(counter)) == 1
+
+
+def test_leader_exception_reaches_waiters():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def fail():
+        release.wait(timeout=5)
+        raise RuntimeError("db down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, "k", fail) for _ in range(3)]
+        while flight.stats()["calls"] < 3:
+            time.sleep(0.001)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="db down"):
+                future.result(timeout=5)
+
+    # The failed flight is cleared, so the next call runs again
+    assert flight.do("k", lambda: "ok") == "ok"
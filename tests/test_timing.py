@@ -0,0 +1,56 @@
+"""Tests for stage timing spans."""
+
+import asyncio
+
+from carms.timing import (
+    STAGE_METRIC,
+    Histogram,
+    registry,
+    server_timing_header,
+    span,
+    start_request,
+    timed,
+)
+
+
+def test_spans_accumulate_into_current_request():
+    timings = start_request()
+    with span("sql"):
+        pass
+    with span("sql"):
+        pass
+    with span("map"):
+        pass
+    assert set(timings) == {"sql", "map"}
+    assert all(ms >= 0 for ms in timings.values())
+
+
+def test_timed_wraps_sync_and_async_functions():
+    @timed("unit.sync")
+    def add(a, b):
+        return a + b
+
+    @timed("unit.async")
+    async def double(x):
+        return 2 * x
+
+    timings = start_request()
+    assert add(1, 2) == 3
+    assert asyncio.run(double(4)) == 8
+    assert "unit.sync" in timings
+    assert "unit.async" in timings
+
+    histograms = registry.snapshot()
+    assert histograms[(STAGE_METRIC, (("stage", "unit.sync"),))].count >= 1
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    assert histogram.counts == [0, 1, 2]
+    assert histogram.count == 2
+
+
+def test_server_timing_header_format():
+    assert server_timing_header({"embed": 12.345, "sql": 3.0}) == "embed;dur=12.3, sql;dur=3.0"